@@ -0,0 +1,21 @@
+import os
+import pytest
+
+
+def pytest_collection_modifyitems(config, items):
+    """ActiveDSO is a Windows COM component, skip the tests parametrized with it on other platforms"""
+    if os.name == 'nt':
+        return
+    skip_activedso = pytest.mark.skip(reason='ActiveDSO is only available on Windows')
+    for item in items:
+        callspec = getattr(item, 'callspec', None)
+        if callspec is None:
+            continue
+        if any(getattr(param, '__name__', param) == 'ActiveDSO' for param in callspec.params.values()):
+            item.add_marker(skip_activedso)
+
+
+@pytest.fixture(scope='session')
+def random_payload() -> bytes:
+    """Random file contents for the transfer tests, generated once for all transports"""
+    return os.urandom(100000)
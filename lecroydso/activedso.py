@@ -28,10 +28,9 @@ class ActiveDSO(DSOConnection):
             from win32com.client import DispatchEx
             self.aDSO = DispatchEx('LeCroy.ActiveDSOCtrl.1')
 
-        except:     # noqa
+        except Exception as e:
             self.connected = False
-            raise DSOConnectionError('ActiveDSO not installed or registered')
-            return
+            raise DSOConnectionError('ActiveDSO not installed or registered') from e
 
         if self.aDSO.MakeConnection(connection_string):
             if 'IP:' in connection_string or 'TCPIP:' in connection_string or 'VXI11:' in connection_string:
@@ -39,12 +38,11 @@ class ActiveDSO(DSOConnection):
                 self.aDSO.SetTimeout(1.0)  # set 1 second as timeout for these types of connections
             self.connected = True
             self.connection_string = connection_string
-            self._query_response_max_length = query_response_max_length
+            self._query_response_max_length = int(query_response_max_length)
             self._insert_wait_opc = False
         else:
             self.connected = False
             raise DSOConnectionError('ActiveDSO connection failed, {}'.format(connection_string))
-            return
 
     def __del__(self):
         self.disconnect()
@@ -75,7 +73,7 @@ class ActiveDSO(DSOConnection):
 
     @query_response_max_length.setter
     def query_response_max_length(self, val: int):
-        self._query_respose_max_length = val
+        self._query_response_max_length = int(val)
 
     @timeout.setter
     def timeout(self, timeout: float):
@@ -108,7 +106,6 @@ class ActiveDSO(DSOConnection):
         else:
             self.connected = False
             raise DSOConnectionError('ActiveDSO connection failed')
-            return
 
     def write(self, message: str, terminator: bool = True):
         """sends a strings to the DSO with or without a terminating character
@@ -153,13 +150,26 @@ class ActiveDSO(DSOConnection):
 
         return response
 
+    async def query_async(self, message: str, query_delay: float = None) -> str:
+        """Send the query and returns the response. The COM object can only be used from the thread that
+        created it, so unlike the other connections the query runs on the event loop thread.
+
+        Args:
+            message (str): command to send
+            query_delay (float, optional): delay between the command and response. Defaults to None.
+
+        Returns:
+            str: Response from the instrument
+        """
+        return self.query(message, query_delay)
+
     def write_vbs(self, message: str):
         """sends the command as a vbs formatted comamnd
 
         Args:
             message (string): command string
         """
-        self.aDSO.WriteString('vbs \'' + message + '\'', True)
+        self.aDSO.WriteString(f"vbs '{message}'", True)
         if self._insert_wait_opc:
             self.wait_opc()
 
@@ -172,7 +182,7 @@ class ActiveDSO(DSOConnection):
         Returns:
             string:
         """
-        if self.aDSO.WriteString('vbs? \'Return = ' + message + '\'', True):
+        if self.aDSO.WriteString(f"vbs? 'Return = {message}'", True):
             if query_delay is not None:
                 time.sleep(query_delay)
             response = self.aDSO.ReadString(self._query_response_max_length)
@@ -6,9 +6,27 @@
 # -----------------------------------------------------------------------------
 #
 
+import asyncio
 
 maxLen = 1e6
 
+# files are transferred to and from the instrument in chunks of this size
+_TRANSFER_CHUNK_SIZE = 1 << 20
+
+
+def _trfl_header(remote_device: str, remote_filename: str, query: bool = False) -> str:
+    """Builds the TRFL command of a file transfer, up to the block header
+
+    Args:
+        remote_device (str): The device name on the instrument end, typically CARD, HDD
+        remote_filename (str): The name and path of the file on the instrument
+        query (bool, optional): True for the TRFL? query reading the file from the instrument. Defaults to False.
+
+    Returns:
+        str: command
+    """
+    return 'TRFL{0} DISK,{1},FILE,"{2}",'.format('?' if query else '', remote_device, remote_filename)
+
 
 class DSOConnection:
     """Interface for DSOConnection types. This can be passed into a LeCroyDSO object
@@ -45,6 +63,20 @@ class DSOConnection:
     def query(self, message: str, query_delay: float = None) -> str:
         pass
 
+    async def query_async(self, message: str, query_delay: float = None) -> str:
+        """Send the query from a worker thread, so queries to several instruments can run concurrently.
+        Only one query per connection can be outstanding, await it before using the connection again.
+
+        Args:
+            message (str): command to send
+            query_delay (float, optional): delay between the command and response. Defaults to None.
+
+        Returns:
+            str: Response from the instrument
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.query, message, query_delay)
+
     def write_vbs(self, message: str):
         pass
 
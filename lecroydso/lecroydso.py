@@ -5,15 +5,123 @@
 # Copyright 2021-2024 Teledyne LeCroy Corporation. All Rights Reserved.
 # -----------------------------------------------------------------------------
 
-from lecroydso.errors import ParametersError
+from lecroydso.errors import DSOConnectionError, ParametersError
 from lecroydso import DSOConnection
 import time
 import re
+import functools
+import hashlib
+import json
 import logging
+from contextlib import contextmanager
 from datetime import datetime
 
 verbose = 2     # set 1 (or 2)
 
+# allowed values for the setters, upper case
+_TRIGGER_MODES = frozenset({'AUTO', 'NORMAL', 'SINGLE', 'STOPPED'})
+_TRIGGER_TYPES = frozenset({'EDGE', 'WIDTH', 'QUALIFIED', 'WINDOW', 'INTERNAL', 'TV', 'PATTERN'})
+_TRIGGER_COUPLINGS = frozenset({'DC', 'AC', 'LFREJ', 'HFREJ'})
+_TRIGGER_SLOPES = frozenset({'POSITIVE', 'NEGATIVE', 'EITHER'})
+_EXT_LINE = frozenset({'EXT', 'LINE'})
+_HOLDOFF_TYPES = frozenset({'OFF', 'TIME', 'EVENTS'})
+_COUPLINGS = frozenset({'DC50', 'DC1M', 'AC1M', 'GND', 'DC100K'})
+_BANDWIDTH_LIMITS = frozenset({'FULL', '350MHZ', '200MHZ', '100MHZ', '20MHZ', 'RAW'})
+_SAMPLE_MODES = frozenset({'REALTIME', 'RIS', 'ROLL', 'SEQUENCE'})
+_REFERENCE_CLOCKS = frozenset({'INTERNAL', 'EXTERNAL'})
+_MEMORY_MODES = frozenset({'SETMAXIMUMMEMORY', 'FIXEDSAMPLERATE'})
+_DIGITAL_GROUPS = frozenset({'DIGITAL1', 'DIGITAL2', 'DIGITAL3', 'DIGITAL4'})
+_HARDCOPY_DESTINATIONS = frozenset({'CLIPBOARD', 'EMAIL', 'FILE', 'PRINTER', 'REMOTE'})
+_HARDCOPY_AREAS = frozenset({'DSOWINDOW', 'FULLSCREEN', 'GRIDAREAONLY'})
+_HARDCOPY_ORIENTATIONS = frozenset({'PORTRAIT', 'LANDSCAPE'})
+_HARDCOPY_COLORS = frozenset({'BW', 'PRINT', 'STD'})
+_AUX_MODES = frozenset({'TRIGGERENABLED', 'TRIGGEROUT', 'PASSFAIL', 'FASTEDGE', 'OFF'})
+_AUXIN_ATTENUATIONS = frozenset({'X1', 'DIV10'})
+
+# maximum number of VBS statements deferred by pipeline() before they are sent
+_MAX_PENDING_VBS = 32
+
+# statements that change how the statements joined after them with ':' run, a single-line If or On Error
+_VBS_BATCH_END = re.compile(r'\bthen\b|\bon\s+error\b', re.IGNORECASE)
+
+
+def _ttl_cache(seconds: float):
+    """Caches the result of a LeCroyDSO method per arguments for a short time, until the next write
+
+    Args:
+        seconds (float): time in seconds a result stays valid
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            entry = self._ttl_cache_values.get(key)
+            if entry is not None and now - entry[0] < seconds:
+                return entry[1]
+            value = func(self, *args, **kwargs)
+            self._ttl_cache_values[key] = (now, value)
+            return value
+        return wrapper
+    return decorator
+
+
+def _vbs_literal(value) -> str:
+    """Formats a python value as a VBS literal
+
+    Args:
+        value: value to format, strings are quoted and bools become -1 or 0
+
+    Returns:
+        str: VBS literal
+    """
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    if isinstance(value, bool):
+        return '-1' if value else '0'
+    return str(value)
+
+
+def _load_instrument_cache(cache_filename: str) -> dict:
+    """Loads the instrument cache from a JSON file
+
+    Args:
+        cache_filename (str): name of the cache file, None if there is no cache
+
+    Returns:
+        dict: cached [execsAll, maxBandwidth] keyed by *IDN? response, empty if there is no cache
+    """
+    if cache_filename is None:
+        return {}
+    try:
+        with open(cache_filename, 'r') as f:
+            cache = json.load(f)
+    except Exception:
+        # a missing, truncated or foreign file is a cache miss
+        return {}
+    if not isinstance(cache, dict):
+        return {}
+    # drop malformed entries, they are read again from the instrument
+    return {idn: entry for (idn, entry) in cache.items()
+            if isinstance(entry, list) and len(entry) == 2 and isinstance(entry[1], str)
+            and isinstance(entry[0], list) and all(isinstance(name, str) for name in entry[0])}
+
+
+def _save_instrument_cache(cache_filename: str, cache: dict):
+    """Saves the instrument cache to a JSON file
+
+    Args:
+        cache_filename (str): name of the cache file, None if there is no cache
+        cache (dict): cached [execsAll, maxBandwidth] keyed by *IDN? response
+    """
+    if cache_filename is None:
+        return
+    try:
+        with open(cache_filename, 'w') as f:
+            json.dump(cache, f)
+    except OSError:
+        pass
+
 
 # ------------------------------------------------------------------------------------
 # Class: LeCroyDSO
@@ -23,23 +131,38 @@ class LeCroyDSO:
     Args:
         myConnection (DSOConnection): A connection interface to the oscilloscope like ActiveDSO, LeCroyVISA
         log (bool, optional): creates a log output. Defaults to False.
+        cache_filename (str, optional): JSON file caching ExecsNameAll and InstrumentMaxBandwidth per *IDN?, to skip
+            reading them on connect. They change with installed options and probes, see invalidate_instrument_cache.
+            Defaults to None, no cache.
     """
 
-    def __init__(self, connection: DSOConnection, log: bool = False):
+    def __init__(self, connection: DSOConnection, log: bool = False, cache_filename: str = None):
 
         self._conn = connection
+        self._cache_filename = cache_filename
         self.connected = True
         self.verbose = verbose
-        self.logger = None
+        self.logger = logging.getLogger('LeCroyDSO_' + str(self._conn.connection_string))
+        if not self.logger.handlers:
+            self.logger.addHandler(logging.NullHandler())
+        self._logging_enabled = False
         if self.connected is True:
             if log:
-                self.__createLogger(self._conn.connection_string)
+                self.enable_logging()
 
             self._insert_wait_opc = False
+            self._automation_names = {}
+            self._cvar_names_cache = {}
+            self._pending_vbs = []
+            self._pipelining = False
+            self._ttl_cache_values = {}
+            self._installed_vbs_funcs = set()
             self.init_vbs()
 
             # determine what model this scope is
-            (self.manufacturer, self.model, self.serial_number, self.firmware_version) = self.query('*IDN?').split(',')
+            idn = self.query('*IDN?')
+            self._idn = idn
+            (self.manufacturer, self.model, self.serial_number, self.firmware_version) = idn.split(',')
 
             self.available_channels = []
             self.available_digital_channels = []
@@ -49,7 +172,15 @@ class LeCroyDSO:
             self.available_zooms = []
 
             try:
-                self.execsAll = self.query_vbs('app.ExecsNameAll').split(',')
+                cache = _load_instrument_cache(self._cache_filename)
+                if idn in cache:
+                    (self.execsAll, self.maxBandwidth) = cache[idn]
+                else:
+                    # read the execs and the max bandwidth in a single round trip
+                    (execs_all, self.maxBandwidth) = self.query_vbs('app.ExecsNameAll & ";" & app.InstrumentMaxBandwidth').split(';')
+                    self.execsAll = execs_all.split(',')
+                    cache[idn] = [self.execsAll, self.maxBandwidth]
+                    _save_instrument_cache(self._cache_filename, cache)
                 # parse this to get numChannels, numFunctions, numMemories, numParameters
                 for exec in self.execsAll:
                     if exec.startswith('C'):
@@ -72,20 +203,29 @@ class LeCroyDSO:
                 self.available_parameters = ['P1', 'P2', 'P3', 'P4', 'P5', 'P6']
                 self.available_memories = ['M1', 'M2', 'M3', 'M4']
                 self.available_zooms = ['Z1', 'Z2', 'Z3', 'Z4']
+                self.get_instrument_max_bandwidth()
+
+            # logic analyzer threshold group of each digital channel
+            self._digital_groups = {ch: str(int(ch[1:]) // 9) for ch in self.available_digital_channels if ch[1:].isdigit()}
 
-            iNumChannels = len(self.available_channels)
-            self.is_attenuator_used = True
-            if (iNumChannels == 2):
-                self.is_attenuator_used = False
-            self.get_instrument_max_bandwidth()
+            # 2 channel models have no attenuator
+            self.is_attenuator_used = self.num_channels != 2
 
     def __del__(self):
-        if self.connected:
-            self.disconnect_from_dso()
-            self.disconnect()
+        self.close()
+
+    def enable_logging(self):
+        """Logs the session to a file and to the console
+        """
+        self._ensure_handlers()
+        self._logging_enabled = True
 
-    def __createLogger(self, suffix: str):
-        self.logger = logging.getLogger('LeCroyDSO_' + suffix)
+    def _ensure_handlers(self):
+        """Creates the file and console handlers the first time logging is enabled
+        """
+        if any(isinstance(handler, logging.FileHandler) for handler in self.logger.handlers):
+            return
+        suffix = str(self._conn.connection_string)
         self.logger.setLevel(logging.INFO)
 
         # create file handler which logs debug messages
@@ -200,6 +340,13 @@ class LeCroyDSO:
             return True
         raise ParametersError('Zoom source not found')
 
+    def close(self):
+        """Disconnects from the DSO and marks the object as disconnected
+        """
+        if self.connected:
+            self._conn.disconnect()
+            self.connected = False
+
     def disconnect(self):
         if self.connected:
             self.connected = False
@@ -387,15 +534,78 @@ class LeCroyDSO:
         Args:
             message (str): command string
         """
+        self._flush_pending_vbs()
+        # a command may change what the cached getters return
+        self._ttl_cache_values.clear()
         self._conn.write(strCmd)
 
-    def write_vbs(self, strCmd: str):
+    def write_vbs(self, strCmd: str, wait: bool = True):
         """Sends the command as a VBS formatted comamnd
 
         Args:
             message (str): command string
+            wait (bool, optional): False skips the OPC wait enabled by insert_wait_opc, call flush() to
+                synchronize after a batch of commands. Defaults to True.
+        """
+        # a command may change what the cached getters return
+        self._ttl_cache_values.clear()
+        if self._pipelining:
+            self._pending_vbs.append(strCmd)
+            # nothing may be joined after an If or On Error, it would become part of it
+            if len(self._pending_vbs) >= _MAX_PENDING_VBS or _VBS_BATCH_END.search(strCmd):
+                self._flush_pending_vbs()
+            return
+        if wait or not self._conn.insert_wait_opc:
+            self._conn.write_vbs(strCmd)
+        else:
+            self._conn.insert_wait_opc = False
+            try:
+                self._conn.write_vbs(strCmd)
+            finally:
+                self._conn.insert_wait_opc = True
+
+    def _write_vbs_batch(self, statements: list):
+        """Sends several VBS statements as a single command, separated by ':'
+
+        Args:
+            statements (list): VBS statements to execute in order
         """
-        self._conn.write_vbs(strCmd)
+        self.write_vbs(':'.join(statements))
+
+    def _flush_pending_vbs(self):
+        """Sends the VBS statements deferred by pipeline() as a single command
+        """
+        if self._pending_vbs:
+            statements = self._pending_vbs
+            self._pending_vbs = []
+            self._conn.write_vbs(':'.join(statements))
+
+    @contextmanager
+    def pipeline(self):
+        """Defers the VBS commands written inside the block and sends them joined in a single command.
+        Any query, write or wait_opc sends the deferred commands first, so the order is preserved.
+        A statement with a single-line If or On Error is sent with the ones before it and ends the batch.
+        When the block raises, the commands not yet sent are dropped.
+
+        Example:
+            with dso.pipeline():
+                dso.set_ver_scale('C1', 0.1)
+                dso.set_ver_offset('C1', 0.0)
+        """
+        if self._pipelining:
+            # nested, the outer block sends the commands
+            yield self
+            return
+        self._pipelining = True
+        try:
+            yield self
+        except BaseException:
+            # don't apply a half built batch
+            self._pending_vbs = []
+            raise
+        finally:
+            self._pipelining = False
+        self._flush_pending_vbs()
 
     def query(self, message: str, query_delay: float = None) -> str:
         """Send the query and returns the response
@@ -407,6 +617,7 @@ class LeCroyDSO:
         Returns:
             string: Response from the instrument
         """
+        self._flush_pending_vbs()
         return self._conn.query(message, query_delay)
 
     def query_vbs(self, message: str, query_delay: float = None) -> str:
@@ -419,6 +630,7 @@ class LeCroyDSO:
         Returns:
             string: Response from the instrument
         """
+        self._flush_pending_vbs()
         return self._conn.query_vbs(message, query_delay)
 
     def vbs(self, vbs_command: str, is_query: bool = False, max_length: int = None) -> str:
@@ -452,19 +664,32 @@ class LeCroyDSO:
         self.write_vbs('app.SaveRecall.Setup.DoRecallDefaultPanelWithTriggerModeAuto')
         self.wait_opc()
         self.wait_opc()
+        self.invalidate_automation_cache()
 
     def restart_app(self):
         """Restarts the scope application
+
+        Raises:
+            DSOConnectionError: when the connection can't be made again after the restart
         """
         self.disconnect()
         self.write_vbs('app.Restart')
-        # wait and reconnect
-        for _ in range(20):
-            time.sleep(5)
-            self._conn.reconnect()
+        # the old application keeps listening while it shuts down, don't poll before it is gone
+        time.sleep(5.0)
+        # reconnect, backing off from 0.5s up to 5s between attempts
+        delay = 0.5
+        for _ in range(30):
+            try:
+                self._conn.reconnect()
+            except DSOConnectionError:
+                pass
             if self._conn.connected:
                 break
-        self.__init__(self._conn, self.logger)
+            time.sleep(delay)
+            delay = min(delay * 1.5, 5.0)
+        else:
+            raise DSOConnectionError('Unable to reconnect after restarting the application')
+        self.__init__(self._conn, self._logging_enabled, self._cache_filename)
 
     def acquire(self, timeout: float = 0.1, force: bool = True) -> bool:
         """Acquire a waveform
@@ -495,6 +720,7 @@ class LeCroyDSO:
         Returns:
             str: panel file returned as a string, trailing terminator removed
         """
+        self._flush_pending_vbs()
         setup = self._conn.get_panel()
 
         if filename is not None:
@@ -512,12 +738,15 @@ class LeCroyDSO:
         Returns:
             bool: True on success, False on failure
         """
+        self.invalidate_automation_cache()
         if filename is None:
             theSetup = setup
         else:
             with open(filename, 'r') as f:
                 theSetup = f.read() + 'ffffffff'
 
+        self._flush_pending_vbs()
+        self._ttl_cache_values.clear()
         return self._conn.set_panel(theSetup)
 
     def get_waveform(self, source: str) -> bytes:
@@ -530,20 +759,20 @@ class LeCroyDSO:
             bytes: return the waveform as bytes, may need to processed further to make sense of it
         """
         self.validate_source(source)
+        self._flush_pending_vbs()
         self._conn.write('{}:WF?'.format(source))
-        time.sleep(0.1)
 
         # read the first 11 bytes, this gives us the length of the transfer
-        header = self._conn.read_raw(15)
-        if 'WARNING' in str(header):
+        # check the raw bytes, str() of a memoryview never contains the response text
+        header = bytes(self._conn.read_raw(15))
+        if b'WARNING' in header:
             return ''
 
-        tmp = header[6:15]
-        # get number of bytes in the response
-        bytes = int(tmp.tobytes().decode('utf-8'))
+        # get number of bytes in the response, int() parses the ascii digits directly
+        length = int(header[6:15])
 
         # read the amount of data
-        wf = self._conn.read_raw(bytes)
+        wf = self._conn.read_raw(length)
         return wf
 
     def transfer_file_to_dso(self, remoteDevice: str, remoteFileName: str, localFileName: str) -> bool:
@@ -557,6 +786,7 @@ class LeCroyDSO:
         Returns:
             bool: True on success, False on failure
         """
+        self._flush_pending_vbs()
         response = self._conn.transfer_file_to_dso(remoteDevice, remoteFileName, localFileName)
         return response >= 0.0
 
@@ -571,6 +801,7 @@ class LeCroyDSO:
         Returns:
             bool: True on success, False on failure
         """
+        self._flush_pending_vbs()
         response = self._conn.transfer_file_to_pc(remoteDevice, remoteFileName, localFileName)
         return response >= 0.0
 
@@ -584,11 +815,12 @@ class LeCroyDSO:
         Returns:
             tuple: returns (value, status)
         """
-        result = self.query(channel + ':PAVA? ' + measurement).split(',')
-        status = result[2]
+        # response is 'measurement,value,status', only value and status are needed
+        (_, _, rest) = self.query(channel + ':PAVA? ' + measurement).partition(',')
+        (value_str, _, status) = rest.partition(',')
 
         if status.upper() == 'OK':
-            value = float(result[1])
+            value = float(value_str)
         else:
             value = 0.0
 
@@ -603,7 +835,7 @@ class LeCroyDSO:
         Raises:
             ParametersError: if the source is not valid
         """
-        if (source.upper() in ['EXT', 'LINE'] or self.validate_source(source)):
+        if (source.upper() in _EXT_LINE or self.validate_source(source)):
             self.write_vbs('acq.Trigger.source = "' + source.upper() + '"')
         else:
             raise ParametersError('source not found')
@@ -617,7 +849,7 @@ class LeCroyDSO:
         Raises:
             ParametersError: invalid values
         """
-        if mode.upper() in ['AUTO', 'NORMAL', 'SINGLE', 'STOPPED']:
+        if mode.upper() in _TRIGGER_MODES:
             self.write_vbs('acq.triggermode = "' + mode.upper() + '"')
             self.wait_opc()
         else:
@@ -651,7 +883,7 @@ class LeCroyDSO:
         Raises:
             ParametersError: Invalid channel or coupling
         """
-        if ((channel.upper() in self.available_channels) and (coupling.upper() in ('DC', 'AC', 'LFREJ', 'HFREJ'))):
+        if ((channel.upper() in self.available_channels) and (coupling.upper() in _TRIGGER_COUPLINGS)):
             self.write_vbs('acq.Trigger.' + channel.upper() + 'Coupling = "' + coupling.upper() + '"')
         else:
             raise ParametersError('Trigger Coupling not valid')
@@ -662,7 +894,7 @@ class LeCroyDSO:
         Args:
             type (str): possible values ['OFF', 'TIME', 'EVENTS']
         """
-        if type.upper() in ['OFF', 'TIME', 'EVENTS']:
+        if type.upper() in _HOLDOFF_TYPES:
             self.write_vbs('acq.Trigger.HoldoffType = "' + type.upper() + '"')
 
     def set_holdoff_events(self, numEvents: int = 1):
@@ -704,12 +936,12 @@ class LeCroyDSO:
         Raises:
             ParametersError: on invalid Channel source
         """
-        if (source.upper() in ('EXT') or source.upper() in self.available_channels):
+        if (source.upper() == 'EXT' or source.upper() in self.available_channels):
             self.write_vbs('acq.Trigger.' + source.upper() + 'Level = ' + str(level))
         elif (source.upper() in self.available_digital_channels):
-            group = int(source.upper().replace('D', '')) / 9
-            self.write_vbs('app.LogicAnalyzer.MSxxLogicFamily' + str(group) + ' = "UserDefined"')
-            self.write_vbs('app.LogicAnalyzer.MSxxThreshold' + str(group) + ' = ' + str(level))
+            group = self._digital_groups[source.upper()]
+            self.write_vbs('app.LogicAnalyzer.MSxxLogicFamily' + group + ' = "UserDefined"')
+            self.write_vbs('app.LogicAnalyzer.MSxxThreshold' + group + ' = ' + str(level))
         else:
             raise ParametersError('source not found')
 
@@ -724,9 +956,9 @@ class LeCroyDSO:
             ParametersError: on invalid Digital Channel Source and invalid level
         """
         if (self.validate_digital_source(source) and level >= .1 and level <= 1.4):
-            group = int(source.upper().replace('D', '')) / 9
-            self.write_vbs('app.LogicAnalyzer.MSxxLogicFamily' + str(group) + ' = "UserDefined"')
-            self.write_vbs('app.LogicAnalyzer.MSxxHysteresis' + str(group) + ' = ' + str(level), True)
+            group = self._digital_groups[source.upper()]
+            self.write_vbs('app.LogicAnalyzer.MSxxLogicFamily' + group + ' = "UserDefined"')
+            self.write_vbs('app.LogicAnalyzer.MSxxHysteresis' + group + ' = ' + str(level), True)
         else:
             raise ParametersError('source not found')
 
@@ -739,7 +971,7 @@ class LeCroyDSO:
         Raises:
             ParametersError: on invalid Trigger Type
         """
-        if type.upper() in ['EDGE', 'WIDTH', 'QUALIFIED', 'WINDOW', 'INTERNAL', 'TV', 'PATTERN']:
+        if type.upper() in _TRIGGER_TYPES:
             self.write_vbs('acq.Trigger.type = ' + type.upper())
         else:
             raise ParametersError('source not found')
@@ -754,10 +986,10 @@ class LeCroyDSO:
         Raises:
             ParametersError: on invalid source or slope
         """
-        if (slope.upper() in ['POSITIVE', 'NEGATIVE', 'EITHER']):
+        if (slope.upper() in _TRIGGER_SLOPES):
             if (channel.upper() in self.available_channels):
                 self.write_vbs('acq.Trigger.' + channel.upper() + '.slope = "' + slope.upper() + '"')
-            elif channel.uppper in ['EXT', 'LINE']:
+            elif channel.upper() in _EXT_LINE:
                 self.write_vbs('acq.Trigger.' + channel.upper() + '.slope = "' + slope.upper() + '"')
             else:
                 raise ParametersError('source not found')
@@ -774,15 +1006,15 @@ class LeCroyDSO:
         Raises:
             ParametersError: on invalid Coupling
         """
-        if coupling.upper() not in ['DC50', 'DC1M', 'AC1M', 'GND', 'DC100k']:
+        if coupling.upper() not in _COUPLINGS:
             raise ParametersError('Invalid Coupling')
         if source.upper() in self.available_channels:
-            self.write_vbs('app.acquisition.' + source.upper() + '.Coupling = "' + coupling.upper() + '"')
+            self.write_vbs('app.acquisition.' + source.upper() + '.Coupling = "' + coupling.upper() + '"', wait=False)
         else:
             if source.upper() == 'EXT':
                 source = 'AUXIN'
             if source.upper() == 'AUXIN':
-                self.write_vbs('app.acquisition.' + source.upper() + '.Coupling = "' + coupling.upper() + '"')
+                self.write_vbs('app.acquisition.' + source.upper() + '.Coupling = "' + coupling.upper() + '"', wait=False)
 
     def set_ver_offset(self, source: str, offset: float = 0.0):
         """Sets the vertical offset of the channel
@@ -795,7 +1027,7 @@ class LeCroyDSO:
             ParametersError: on invalid channel source
         """
         if source.upper() in self.available_channels:
-            self.write_vbs('app.acquisition.' + source.upper() + '.VerOffset = ' + str(offset))
+            self.write_vbs('app.acquisition.' + source.upper() + '.VerOffset = ' + str(offset), wait=False)
         else:
             raise ParametersError('source not found')
 
@@ -811,9 +1043,9 @@ class LeCroyDSO:
             ParametersError: on invalid source or group
         """
         if (channel.upper() in self.available_channels):
-            self.write_vbs('app.acquisition.' + channel.upper() + '.view = ' + str(view))
-        elif (channel.upper() in self.available_digital_channels and digitalGroup.upper() in ('DIGITAL1', 'DIGITAL2', 'DIGITAL3', 'DIGITAL4')):
-            self.write_vbs('app.LogicAnalyzer.' + digitalGroup.upper() + '.Digital' + channel.upper()[1:] + ' = ' + str(view))
+            self.write_vbs('app.acquisition.' + channel.upper() + '.view = ' + str(view), wait=False)
+        elif (channel.upper() in self.available_digital_channels and digitalGroup.upper() in _DIGITAL_GROUPS):
+            self.write_vbs('app.LogicAnalyzer.' + digitalGroup.upper() + '.Digital' + channel.upper()[1:] + ' = ' + str(view), wait=False)
         else:
             raise ParametersError('source not found')
 
@@ -827,8 +1059,8 @@ class LeCroyDSO:
         Raises:
             ParametersError: on invalid channel source or bandwidth limit
         """
-        if (self.validate_channel_source(channel) and (bandwidth.upper() in ['FULL', '350MHZ', '200MHZ', '100MHZ', '20MHZ', 'RAW'])):
-            self.write_vbs('app.acquisition.' + channel.upper() + '.BandwidthLimit = "' + bandwidth.upper() + '"')
+        if (self.validate_channel_source(channel) and (bandwidth.upper() in _BANDWIDTH_LIMITS)):
+            self.write_vbs('app.acquisition.' + channel.upper() + '.BandwidthLimit = "' + bandwidth.upper() + '"', wait=False)
         else:
             raise ParametersError('Invalid bandwidth limit')
 
@@ -840,7 +1072,7 @@ class LeCroyDSO:
             ver_scale (float, optional): vertical scale. Defaults to 0.001.
         """
         self.validate_channel_source(channel)
-        self.write_vbs('acq.' + channel.upper() + '.VerScale = ' + str(ver_scale))
+        self.write_vbs('acq.' + channel.upper() + '.VerScale = ' + str(ver_scale), wait=False)
 
     def set_ver_scale_variable(self, channel: str, variable: bool = False):
         """Set vertical scale variable flag
@@ -849,8 +1081,9 @@ class LeCroyDSO:
             channel (str): Channel source
             variable (bool, optional): True sets the variable flag to ON and the step of the vertical scale is variable. Defaults to False.
         """
+        channel = channel.upper()
         self.validate_channel_source(channel)
-        self.write_vbs('acq.' + channel.upper() + '.VerScaleVariable = ' + '1' if variable else '0')
+        self.write_vbs('acq.' + channel + '.VerScaleVariable = ' + ('1' if variable else '0'), wait=False)
 
     def set_sample_mode(self, sample_mode: str = 'REALTIME', segments: int = 10):
         """Sets the sample mode of the DSO
@@ -859,7 +1092,7 @@ class LeCroyDSO:
             sample_mode (str, optional): Typical values for sample mode are REALTIME|RIS|ROLL|SEQUENCE. Defaults to 'REALTIME'.
             segments (int, optional): This is used for Sequence mode to set the number of segments. Defaults to 10.
         """
-        if sample_mode.upper() in ['REALTIME', 'RIS', 'ROLL', 'SEQUENCE']:
+        if sample_mode.upper() in _SAMPLE_MODES:
             self.write_vbs('acqHorz.samplemode = "' + sample_mode.upper() + '"')
             if sample_mode.upper() == 'SEQUENCE' and segments >= 2:
                 self.write_vbs('acqHorz.numsegments = ' + str(segments))
@@ -875,7 +1108,7 @@ class LeCroyDSO:
         Raises:
             ParametersError: on invalid reference
         """
-        if reference.upper() in ('INTERNAL', 'EXTERNAL'):
+        if reference.upper() in _REFERENCE_CLOCKS:
             self.write_vbs('acqHorz.referenceclock = "' + reference.upper() + '"')
         else:
             raise ParametersError('Invalid Reference clock')
@@ -937,7 +1170,7 @@ class LeCroyDSO:
         Raises:
             ParametersError: on invalid Memory mode
         """
-        if maximize.upper() in ['SETMAXIMUMMEMORY', 'FIXEDSAMPLERATE']:
+        if maximize.upper() in _MEMORY_MODES:
             self.write_vbs('acqHorz.maximize = "' + maximize.upper() + '"')
         else:
             raise ParametersError('Invalid Memory mode')
@@ -955,13 +1188,13 @@ class LeCroyDSO:
         """
         if filename is not None:
             self.write_vbs('app.Hardcopy.PreferredFilename = "' + filename + '"')
-        if destination.upper() in ['CLIPBOARD', 'EMAIL', 'FILE', 'PRINTER', 'REMOTE']:
+        if destination.upper() in _HARDCOPY_DESTINATIONS:
             self.write_vbs('app.Hardcopy.Destination = "' + destination.upper() + '"')
-        if area.upper() in ['DSOWINDOW', 'FULLSCREEN', 'GRIDAREAONLY']:
+        if area.upper() in _HARDCOPY_AREAS:
             self.write_vbs('app.Hardcopy.HardCopyArea = "' + area.upper() + '"')
-        if orientation.upper() in ['PORTRAIT', 'LANDSCAPE']:
+        if orientation.upper() in _HARDCOPY_ORIENTATIONS:
             self.write_vbs('app.Hardcopy.Orientation = "' + orientation.upper() + '"')
-        if color.upper() in ['BW', 'PRINT', 'STD']:
+        if color.upper() in _HARDCOPY_COLORS:
             self.write_vbs('app.Hardcopy.UseColor = "' + color.upper() + '"')
 
     def hardcopy_print(self):
@@ -1031,6 +1264,16 @@ class LeCroyDSO:
         time_per_point = float(self.query_vbs('acqHorz.timeperpoint'))
         return time_per_point
 
+    def get_horizontal_state(self) -> tuple:
+        """Gets the horizontal settings of the DSO in a single query
+
+        Returns:
+            tuple: Returns the values (hor_scale, num_points, sample_rate, time_per_point)
+        """
+        response = self.query_vbs('acqHorz.horscale & "," & acqHorz.numpoints & "," & acqHorz.samplerate & "," & acqHorz.timeperpoint')
+        (hor_scale, num_points, sample_rate, time_per_point) = response.split(',')
+        return (float(hor_scale), float(num_points), float(sample_rate), float(time_per_point))
+
     def get_ver_scale(self, channel: str) -> float:
         """Get Vertical scale of the DSO
 
@@ -1062,6 +1305,7 @@ class LeCroyDSO:
         """
         self.write_vbs('app.SaveRecall.Setup.DoRecallDefaultPanel')
         self.wait_opc()
+        self.invalidate_automation_cache()
 
     def get_serial_number(self) -> str:
         """Get the serial number of the DSO
@@ -1105,7 +1349,7 @@ class LeCroyDSO:
         Args:
             on (bool): True turns on measurement statistics
         """
-        self.write_vbs('meas.StatsOn = ' + '1' if on else '0')
+        self.write_vbs('meas.StatsOn = ' + ('1' if on else '0'))
 
     def set_measure(self, parameter: str, source1: str, source2: str = 'None', param_engine: str = 'TimeAtLevel', view: bool = True):
         """Setup a parameter measurement
@@ -1121,10 +1365,28 @@ class LeCroyDSO:
             ParametersError: on invalid paramter source
         """
         self.validate_parameters_source(parameter)
-        self.write_vbs('meas.' + parameter.upper() + '.ParamEngine = "' + param_engine.upper() + '"')
-        self.write_vbs('meas.' + parameter.upper() + '.Source1 = "' + source1.upper() + '"')
-        self.write_vbs('meas.' + parameter.upper() + '.Source2 = "' + source2.upper() + '"')
-        self.write_vbs('meas.View' + parameter.upper() + ' = 1' if view else ' = 0')
+        parameter = parameter.upper()
+        self._write_vbs_batch(['meas.' + parameter + '.ParamEngine = "' + param_engine.upper() + '"',
+                               'meas.' + parameter + '.Source1 = "' + source1.upper() + '"',
+                               'meas.' + parameter + '.Source2 = "' + source2.upper() + '"',
+                               'meas.View' + parameter + (' = 1' if view else ' = 0')])
+
+    def set_measurements(self, cfg: dict):
+        """Sets properties of several parameter measurements in a single command
+
+        Args:
+            cfg (dict): properties to set keyed by parameter, {'P1': {'ParamEngine': 'Mean', 'Source1': 'C1'}, ...}
+
+        Raises:
+            ParametersError: on invalid paramter source
+        """
+        statements = []
+        for (parameter, props) in cfg.items():
+            self.validate_parameters_source(parameter)
+            parameter = parameter.upper()
+            statements.extend(f'meas.{parameter}.{prop} = {_vbs_literal(value)}' for (prop, value) in props.items())
+        if statements:
+            self._write_vbs_batch(statements)
 
     def get_measure_stats(self, parameter: str) -> tuple:
         """Reads the measurement statistics values for a parameter
@@ -1139,22 +1401,19 @@ class LeCroyDSO:
             ParametersError: on invalid paramter source
         """
         self.validate_parameters_source(parameter)
-        last = self.query_vbs('meas.' + parameter + '.last.Result.Value')
-        max = self.query_vbs('meas.' + parameter + '.max.Result.Value')
-        mean = self.query_vbs('meas.' + parameter + '.mean.Result.Value')
-        min = self.query_vbs('meas.' + parameter + '.min.Result.Value')
-        num = self.query_vbs('meas.' + parameter + '.num.Result.Value')
-        sdev = self.query_vbs('meas.' + parameter + '.sdev.Result.Value')
-        status = self.query_vbs('meas.' + parameter + '.Out.Result.Status')
-        self.wait_opc()
+        # read all the values in a single query, comma separated
+        stats = ['meas.' + parameter + '.' + stat + '.Result.Value' for stat in ('last', 'max', 'mean', 'min', 'num', 'sdev')]
+        stats.append('meas.' + parameter + '.Out.Result.Status')
+        (last, max, mean, min, num, sdev, status) = self.query_vbs(' & "," & '.join(stats)).split(',')
 
         return (last, max, mean, min, num, sdev, status)
 
-    def get_measure_value(self, parameter: str) -> float:
+    def get_measure_value(self, parameter: str, sync: bool = False) -> float:
         """Gets the last measurement value of a parameter
 
         Args:
             parameter (str): Parameter source P1 to Pn
+            sync (bool, optional): True waits for prior operations to complete before reading. Defaults to False.
 
         Returns:
             [float]: Last measurement value of the parameter, -999999.99 on error
@@ -1163,6 +1422,8 @@ class LeCroyDSO:
             ParametersError: on invalid parameter source
         """
         self.validate_parameters_source(parameter)
+        if sync:
+            self.wait_opc()
         last = self.query_vbs('meas.' + parameter + '.last.Result.Value')
         try:
             fLast = float(last)
@@ -1170,11 +1431,12 @@ class LeCroyDSO:
             fLast = -999999.99
         return fLast
 
-    def get_measure_mean(self, parameter: str) -> float:
+    def get_measure_mean(self, parameter: str, sync: bool = False) -> float:
         """Gets the mean value of the parameter
 
         Args:
             parameter (str): Parameter source P1 to Pn
+            sync (bool, optional): True waits for prior operations to complete before reading. Defaults to False.
 
         Returns:
             [float]: Mean value of the parameter, -999999.99 on error
@@ -1183,10 +1445,12 @@ class LeCroyDSO:
             ParametersError: on invalid parameter source
         """
         self.validate_parameters_source(parameter)
+        if sync:
+            self.wait_opc()
         mean = self.query_vbs('meas.' + parameter + '.mean.Result.Value')
         try:
             fMean = float(mean)
-        except TypeError:
+        except ValueError:
             fMean = -999999.99
         return fMean
 
@@ -1202,8 +1466,9 @@ class LeCroyDSO:
         """
         self.validate_source(source)
         self.validate_zoom_source(zoom)
-        self.write_vbs('zoom.' + zoom.upper() + '.Source = "' + source.upper() + '"')
-        self.write_vbs('zoom.' + zoom.upper() + '.View = ' + str(-1))
+        z = zoom.upper()
+        self._write_vbs_batch([f'zoom.{z}.Source = "{source.upper()}"',
+                               f'zoom.{z}.View = -1'])
 
     def show_zoom(self, zoom: str, show: bool = True):
         """Set the zoom trace view on or off
@@ -1216,7 +1481,7 @@ class LeCroyDSO:
             ParametersError: on invalid zoom source
         """
         self.validate_zoom_source(zoom)
-        self.write_vbs('zoom.' + zoom.upper() + '.View = ' + str(-1) if show else str(0))
+        self.write_vbs(f'zoom.{zoom.upper()}.View = {-1 if show else 0}')
 
     def set_zoom_segment(self, zoom: str, startSeg: int = 1, numToShow: int = 1):
         """Set the Zoom segment for sequence mode waveforms
@@ -1230,8 +1495,9 @@ class LeCroyDSO:
             ParametersError: on invalid zoom source
         """
         self.validate_zoom_source(zoom)
-        self.write_vbs('zoom.' + zoom.upper() + '.Zoom.SelectedSegment = "' + str(startSeg) + '"')
-        self.write_vbs('zoom.' + zoom.upper() + '.Zoom.NumSelectedSegments = "' + str(numToShow) + '"')
+        z = zoom.upper()
+        self._write_vbs_batch([f'zoom.{z}.Zoom.SelectedSegment = "{startSeg}"',
+                               f'zoom.{z}.Zoom.NumSelectedSegments = "{numToShow}"'])
 
     def set_aux_mode(self, mode: str):
         """Set the Auxilary mode
@@ -1242,8 +1508,9 @@ class LeCroyDSO:
         Raises:
             ParametersError: on invalid Auxilary mode values
         """
-        if mode.upper() in ['TRIGGERENABLED', 'TRIGGEROUT', 'PASSFAIL', 'FASTEDGE', 'OFF']:
-            self.write_vbs('app.Acquisition.AuxOutput.AuxMode = "' + mode.upper() + '"')
+        mode = mode.upper()
+        if mode in _AUX_MODES:
+            self.write_vbs(f'app.Acquisition.AuxOutput.AuxMode = "{mode}"')
         else:
             raise ParametersError('Invalid Auxilary Mode value')
 
@@ -1256,21 +1523,28 @@ class LeCroyDSO:
         self.write_vbs('meas.ShowMeasure = 1' if show else 'meas.ShowMeasure = 0')
 
     def set_auxin_attenuation(self, attenuation: str = 'X1'):
-        if attenuation.upper() in ['X1', 'DIV10']:
-            self.write_vbs('app.acquisition.AuxIn.Attenuation = "' + attenuation + '"')
+        attenuation = attenuation.upper()
+        if attenuation in _AUXIN_ATTENUATIONS:
+            self.write_vbs(f'app.acquisition.AuxIn.Attenuation = "{attenuation}"')
 
     def wait_opc(self):
         """Wait for the previous operation to complete
         """
+        self._flush_pending_vbs()
         self._conn.wait_opc()
 
+    def flush(self):
+        """Wait for the commands sent with wait=False to complete
+        """
+        self.wait_opc()
+
     def sleep(self, tm: float):
         """Sends a sleep command to the instrument
 
         Args:
             tm ([float]): time to sleep in
         """
-        self.write_vbs('app.Sleep {0}'.format(tm))
+        self.write_vbs(f'app.Sleep {tm}')
 
     def force_trigger(self):
         """Forces a trigger on the instrument
@@ -1284,7 +1558,7 @@ class LeCroyDSO:
             [bool]: True if a popup dialog is open, False otherwise
         """
         response = self.query_vbs('not syscon.dialogontop.widgetpageontop.value is Nothing')
-        return re.match('0', response) is None
+        return not response.startswith('0')
 
     def close_popup_dialog(self):
         """Closes any popup dialogs that are open
@@ -1297,7 +1571,7 @@ class LeCroyDSO:
         Args:
             popup_action (str): Popup action string
         """
-        self.write_vbs('syscon.DialogOnTop.{0}'.format(popup_action))
+        self.write_vbs(f'syscon.DialogOnTop.{popup_action}')
 
     def get_docked_dialog_page_names(self, rhs: bool = False) -> list:
         """Gets a list of the docked dialog pages
@@ -1308,11 +1582,13 @@ class LeCroyDSO:
         Returns:
             list: of page names, None if no docked dialogs are open
         """
-        response = self.query_vbs('syscon{0}.DialogPageNames'.format('.Right' if rhs else ''))
+        response = self.query_vbs(f'syscon{".Right" if rhs else ""}.DialogPageNames')
         return None if 'none' in response.lower() else response.split(',')
 
+    @_ttl_cache(seconds=0.1)
     def get_docked_dialog_selected_page(self, rhs: bool = False) -> str:
-        """Gets docked selected page
+        """Gets docked selected page, the result is cached for 0.1s to keep polling loops cheap.
+        Any write or write_vbs clears the cache
 
         Args:
             rhs (bool, optional): True to return the right hand side selected page. Defaults to False.
@@ -1320,9 +1596,23 @@ class LeCroyDSO:
         Returns:
             str: returns the page name of the selected page, None if no docked dialogs are open
         """
-        response = self.query_vbs('syscon{0}' + '.Right' if rhs else '' + 'DialogPage')
+        response = self.query_vbs(f'syscon{".Right" if rhs else ""}.DialogPage')
         return None if response == '' else response
 
+    def get_docked_dialog_state(self, rhs: bool = False) -> tuple:
+        """Gets the docked dialog page names and the selected page in a single query
+
+        Args:
+            rhs (bool, optional): True to return the right hand side dialogs. Defaults to False.
+
+        Returns:
+            tuple: (list of page names, selected page name), each None if no docked dialogs are open
+        """
+        syscon = 'syscon.Right' if rhs else 'syscon'
+        response = self.query_vbs(f'{syscon}.DialogPageNames & "|" & {syscon}.DialogPage')
+        (pages, _, selected) = response.rpartition('|')
+        return (None if 'none' in pages.lower() else pages.split(','), None if selected == '' else selected)
+
     def is_docked_dialog_open(self, rhs: bool) -> bool:
         """Checks if a docked dialog is open
 
@@ -1333,7 +1623,7 @@ class LeCroyDSO:
             bool: Returns True if a docked dialog is open else False
         """
         strPage = self.get_docked_dialog_selected_page(rhs)
-        return strPage.len > 0
+        return strPage is not None and len(strPage) > 0
 
     def close_docked_dialog(self):
         """Closes the docked dialog page
@@ -1369,22 +1659,28 @@ class LeCroyDSO:
         # build a vbs function in the scope context that will generate the comma-sep properties string for each item in the collection.
         # we'll apply the matching specs in python after parsing the responses, since it's much better at that and developing/maintaining/debugging
         # these scope vbs functions is horrible.
-        prop_names = [prop_item[0] for prop_item in filter_spec]
-        get_props_script = ['function getProps(o)']
-        get_props_script.append('on error resume next')
-        get_props_script.append('strProps = \'\'')
-        for prop_name in prop_names:
-            get_props_script.append('strProps = strProps & \',\'')  # default to comma-sep if property doesn't exist
-            get_props_script.append('strProps = strProps & o.{0}'.format(prop_name))
-        get_props_script.append('getProps = strProps')
-        get_props_script.append('end function')
-        script_to_exec = ':'.join(get_props_script)
-        self.write_vbs(script_to_exec)
+        # the function is only defined once per session for each tuple of properties. the VBS namespace is shared by
+        # all connections to the instrument, so the name is derived from the properties and never reused for others
+        prop_names = tuple(prop_item[0] for prop_item in filter_spec)
+        props_hash = hashlib.blake2b(','.join(prop_names).encode('utf-8'), digest_size=8).hexdigest()
+        func_name = 'getProps_{0}'.format(props_hash)
+        if prop_names not in self._installed_vbs_funcs:
+            get_props_script = ['function {0}(o)'.format(func_name)]
+            get_props_script.append('on error resume next')
+            get_props_script.append('strProps = \'\'')
+            for prop_name in prop_names:
+                get_props_script.append('strProps = strProps & \',\'')  # default to comma-sep if property doesn't exist
+                get_props_script.append('strProps = strProps & o.{0}'.format(prop_name))
+            get_props_script.append('{0} = strProps'.format(func_name))
+            get_props_script.append('end function')
+            script_to_exec = ':'.join(get_props_script)
+            self.write_vbs(script_to_exec)
+            self._installed_vbs_funcs.add(prop_names)
 
         # build the vbs query that iterates the collection calling the vbs function for each item, semi-colon sep each item's properties.
         if False:
             # at least for now, for-each (IEnumVARIANT) is not correctly supported on CE... seems to be missing marshalling
-            response = self.query("vbs? 'strProps = \"\": for each obj in {0}: strProps = strProps & \";\" & getProps(obj): next: return = strProps'".format(collection_name))
+            response = self.query("vbs? 'strProps = \"\": for each obj in {0}: strProps = strProps & \";\" & {1}(obj): next: return = strProps'".format(collection_name, func_name))
         else:
             # work-around for bad for-each behavior on CE.
             # painful: need to figure out if collection is 0-based index or not and set the startIndex and stopIndex variables used in query.
@@ -1397,31 +1693,29 @@ class LeCroyDSO:
             vbs_statements.append('on error goto 0')
             vbs_to_exec = ':'.join(vbs_statements)
             self.write_vbs(vbs_to_exec)
-            response = self.query("vbs? 'strProps = \"\": for i = startIndex to stopIndex: set obj = {0}(i): strProps = strProps & \";\" & getProps(obj): next: return = strProps'".format(collection_name))
+            response = self.query("vbs? 'strProps = \"\": for i = startIndex to stopIndex: set obj = {0}(i): strProps = strProps & \";\" & {1}(obj): next: return = strProps'".format(collection_name, func_name))
 
         # parse the response, stripping and splitting on the item and property separators.
         # strip leading semi-colon and split to get list of comma-sep property strings for each object
         props_response = response.lstrip(';').split(';')
+        # only the first len(filter_spec) properties of each item are matched, hoist the matchers out of the loop
+        matchers = [prop_item[1] for prop_item in filter_spec]
+        num_specs = len(matchers)
         output_items = []
         for props in props_response:
 
-            # strip leading command and split to get list of properties
-            list_props = props.lstrip(',').split(',')
+            # strip leading comma and split to get list of properties
+            list_props = props.lstrip(',').split(',', num_specs)[:num_specs]
             output_props = []
             props_matched = 0
-            for idx in range(0, len(list_props)):
-
-                if idx < len(filter_spec):
-                    str_prop = list_props[idx]
-                    str_output = ''
-                    if (filter_spec[idx][1] is None or filter_spec[idx][1].search(str_prop)):
-                        props_matched += 1
-                        str_output = str_prop
-
-                    # add to output list of properties
-                    output_props.append(str_output)
-
-            if (match_all and props_matched == len(filter_spec)) or (not match_all and props_matched > 0):
+            for (matcher, str_prop) in zip(matchers, list_props):
+                if matcher is None or matcher.search(str_prop):
+                    props_matched += 1
+                    output_props.append(str_prop)
+                else:
+                    output_props.append('')
+
+            if (match_all and props_matched == num_specs) or (not match_all and props_matched > 0):
                 # add to output list of objects
                 output_items.append(output_props)
 
@@ -1442,9 +1736,10 @@ class LeCroyDSO:
         Returns:
             list: matching object names
         """
-        objects_into = self.get_automation_items(coll_name, [('name', matching)])
-        object_names = [obj_info[0] for obj_info in objects_into]
-        return object_names
+        (object_names, _) = self._get_automation_names(coll_name)
+        if matching is None:
+            return list(object_names)
+        return [name for name in object_names if re.search(matching, name)]
 
     def does_object_exist(self, coll_name: str, object_name: str) -> bool:
         """Tests if the object exists in the collection
@@ -1456,8 +1751,8 @@ class LeCroyDSO:
         Returns:
             bool: True if specified coll_name has the specified object, False if it does not.
         """
-        cvars_info = self.get_automation_items(coll_name, [('name', re.compile('^{0}$'.format(object_name), re.IGNORECASE))])
-        return len(cvars_info) > 0
+        (_, upper_names) = self._get_automation_names(coll_name)
+        return object_name.upper() in upper_names
 
     def does_cvar_exist(self, object_name: str, cvar_name: str) -> bool:
         """Tests if the cvar exists in an automation object
@@ -1469,8 +1764,38 @@ class LeCroyDSO:
         Returns:
             bool: True if specified object_name has the specified cvar, False if it does not.
         """
-        cvars_info = self.get_automation_items(object_name, [('name', re.compile('^{0}$'.format(cvar_name), re.IGNORECASE))])
-        return len(cvars_info) > 0
+        (_, upper_names) = self._get_automation_names(object_name)
+        return cvar_name.upper() in upper_names
+
+    def _get_automation_names(self, coll_name: str) -> tuple:
+        """Gets the item names of an automation collection, cached until invalidate_automation_cache is called
+
+        Args:
+            coll_name (str): Collection name
+
+        Returns:
+            tuple: (list of names, frozenset of upper case names)
+        """
+        names = self._automation_names.get(coll_name)
+        if names is None:
+            object_names = [obj_info[0] for obj_info in self.get_automation_items(coll_name)]
+            names = (object_names, frozenset(name.upper() for name in object_names))
+            self._automation_names[coll_name] = names
+        return names
+
+    def invalidate_automation_cache(self):
+        """Clears the cached automation collection names, call after the instrument setup changes
+        """
+        self._automation_names.clear()
+        self._cvar_names_cache.clear()
+
+    def invalidate_instrument_cache(self):
+        """Drops the instrument from the cache_filename cache, call after installing options or changing probes.
+        The execs and the bandwidth are read again on the next connect
+        """
+        cache = _load_instrument_cache(self._cache_filename)
+        if cache.pop(self._idn, None) is not None:
+            _save_instrument_cache(self._cache_filename, cache)
 
     def is_cvar_enum_value_in_range(self, cvar_enum_name: str, enum_value: str, range_property: str = 'RangeStringAutomation') -> bool:
         """Tests if Cvar enum value is in range
@@ -1484,7 +1809,8 @@ class LeCroyDSO:
             [bool]: True if cvar is in range else False
         """
         response = self.query_vbs('{0}.{1}'.format(cvar_enum_name, range_property))
-        return re.search(r'(^|,){0}(,|$)'.format(enum_value), response, re.IGNORECASE)
+        enum_values = {value.strip().upper() for value in response.split(',')}
+        return enum_value.upper() in enum_values
 
     def get_cvars_info(self, automation_path: str) -> zip:
         """Get Cvar Info for the automation path specified
@@ -1495,12 +1821,13 @@ class LeCroyDSO:
         Returns:
             zip: zip object containing list of cvar names, types and flags (3-tuple) for the specified automation object.
         """
-        self.write_vbs('s1 = \'\'')     # for some reason, doing this in the query_vbs isn't sufficient... ugh
-        response = self.query_vbs('s1 = \'\': for i=0 to {0}.count - 1: set ocv={0}.Item(i): a1 = Array(s1, ocv.name, ocv.type, ocv.flags): s1 = Join(a1, \',\'): next: return = s1'.format(automation_path))
-        # convert to list and remove 0th element due to extra comma (this is easier than in the VBS code above)
-        lTokens = response.upper().split(',')[1:]
-        iterTokens = iter(lTokens)
-        return zip(iterTokens, iterTokens, iterTokens)
+        # fill an array sized for all the cvars and join it once, element 0 stays empty and is skipped below
+        response = self.query("vbs? 'n = {0}.count: redim a1(3 * n): for i = 0 to n - 1: set ocv = {0}.Item(i): "
+                              "a1(3 * i + 1) = ocv.name: a1(3 * i + 2) = ocv.type: a1(3 * i + 3) = ocv.flags: next: "
+                              "return = Join(a1, \",\")'".format(automation_path))
+        lTokens = response.split(',')
+        # flags are numeric, only the names and types need upper casing
+        return zip([name.upper() for name in lTokens[1::3]], [type.upper() for type in lTokens[2::3]], lTokens[3::3])
 
     def get_panel_cvar_names(self, automation_path: str) -> list:
         """Return list of cvar names for cvars that are eligible for save in panel
@@ -1514,12 +1841,12 @@ class LeCroyDSO:
         # CvarsValuesRemote property returns comma-sep list of cvar,name pairs for all cvars
         # that are eligible for the panel
         response = self.query_vbs('{0}.CvarsValuesRemote'.format(automation_path))
-        lTokens = response.upper().split(',')
-        # slice-spec to create a list containing every other element
-        return lTokens[::2]
+        # slice-spec to take every other element, only the names are upper cased
+        return [name.upper() for name in response.split(',')[::2]]
 
     def get_automation_cvar_names(self, automation_path: str) -> list:
-        """Return list of cvar names for cvars that are available to the user
+        """Return list of cvar names for cvars that are available to the user,
+        cached until invalidate_automation_cache is called
 
         Args:
             automation_path (str): Automation start path
@@ -1527,9 +1854,12 @@ class LeCroyDSO:
         Returns:
             [list]: Returns the Cvar names
         """
-        # these are the panel cvars and any that have cvarflags 16384 (ForcePublic)
-        lPanelCvars = self.get_panel_cvar_names(automation_path)
-        lCvarsInfo = self.get_cvars_info(automation_path)
-        lForcePublic = [cvName for (cvName, cvType, cvFlags) in lCvarsInfo if int(cvFlags) & 16384 == 16384]
-        lPanelCvars.extend(lForcePublic)
-        return lPanelCvars
+        lPanelCvars = self._cvar_names_cache.get(automation_path)
+        if lPanelCvars is None:
+            # these are the panel cvars and any that have cvarflags 16384 (ForcePublic)
+            lPanelCvars = self.get_panel_cvar_names(automation_path)
+            lCvarsInfo = self.get_cvars_info(automation_path)
+            lForcePublic = [cvName for (cvName, cvType, cvFlags) in lCvarsInfo if int(cvFlags) & 16384 == 16384]
+            lPanelCvars.extend(lForcePublic)
+            self._cvar_names_cache[automation_path] = lPanelCvars
+        return list(lPanelCvars)
@@ -8,8 +8,10 @@
 
 
 from lecroydso import DSOConnection
-from lecroydso.errors import DSOConnectionError, DSOIOError
+from lecroydso.errors import DSOConnectionError, DSOIOError, ParametersError
+from lecroydso.dsoconnection import _TRANSFER_CHUNK_SIZE, _trfl_header
 from lecroydso.vicpclient import VICPClient
+import os
 import time
 
 maxLen = 1e6
@@ -24,6 +26,8 @@ class LeCroyVICP(DSOConnection):
             query_response_max_length (integer, optional): Default max bytes for query responses, Defaults to maxLen.
         """
         self.connection_string = None
+        # part of the last response not yet returned by read_raw
+        self._unread = b''
         self.vicp = VICPClient(connection_string, 1861)
 
         if self.vicp.connect(1.0):
@@ -31,14 +35,13 @@ class LeCroyVICP(DSOConnection):
             self._timeout = 1.0
             self.connected = True
             self.connection_string = connection_string
-            self._query_response_max_length = query_response_max_length
+            self._query_response_max_length = int(query_response_max_length)
             self._insert_wait_opc = False
             self._error_flag = False
             self._error_string = ''
         else:
             self.connected = False
             raise DSOConnectionError('LeCroyVICP connection failed, {}'.format(connection_string))
-            return
 
     def __del__(self):
         self.disconnect()
@@ -62,7 +65,7 @@ class LeCroyVICP(DSOConnection):
 
     @query_response_max_length.setter
     def query_response_max_length(self, val: int):
-        self._query_respose_max_length = val
+        self._query_response_max_length = int(val)
 
     @property
     def timeout(self) -> float:
@@ -74,6 +77,7 @@ class LeCroyVICP(DSOConnection):
         if timeout < 0.0:
             raise ValueError("Timeout can't be negative")
         self._timeout = timeout
+        self.vicp.timeout = timeout
 
     @property
     def insert_wait_opc(self):
@@ -94,12 +98,14 @@ class LeCroyVICP(DSOConnection):
     def reconnect(self):
         """Reconnects to the instrument with the existing credentials
         """
+        # close the current socket first, it is replaced by connect
+        self.vicp.disconnect()
+        self._unread = b''
         if self.vicp.connect(self._timeout):
             self.connected = True
         else:
             self.connected = False
             raise DSOConnectionError('LeCroyVICP connection failed')
-            return
 
     def write(self, message: str, terminator: bool = True) -> bool:
         """sends a strings to the DSO with or without a terminating character
@@ -111,10 +117,38 @@ class LeCroyVICP(DSOConnection):
         Returns:
             bool: True on success, False on failure
         """
-        success = self.vicp.send_small_data_and_header(message)
-        if self._insert_wait_opc:
-            self.wait_opc()
-        return success
+        if not self._insert_wait_opc:
+            return self._send(message)
+        # append the OPC query to the command and read its reply, instead of a second transaction
+        if not self._send(message + ';*OPC?'):
+            return False
+        self.read(self._query_response_max_length)
+        return True
+
+    def _send(self, data, eoi: bool = True) -> bool:
+        """sends data to the instrument, the unread part of the previous response is dropped
+
+        Args:
+            data (str or bytes): data to send
+            eoi (bool, optional): True to terminate the message with EOI. Defaults to True.
+
+        Returns:
+            bool: True on success, False on failure
+        """
+        # the VICP client flushes the socket before sending, drop what read_raw left over as well
+        self._unread = b''
+        return self.vicp.send_small_data_and_header(data, eoi)
+
+    def _read_bytes(self) -> bytes:
+        """reads the raw response from the instrument, the rest of a partly read response comes first
+
+        Returns:
+            bytes: response as received, not decoded, a memoryview for the rest of a response
+        """
+        if self._unread:
+            (data, self._unread) = (self._unread, b'')
+            return data
+        return self.vicp.receive()
 
     def read(self, max_bytes: int) -> str:
         """reads string from the instrument
@@ -125,7 +159,8 @@ class LeCroyVICP(DSOConnection):
         Returns:
             str: description
         """
-        return (self.vicp.receive()).decode('utf-8').strip(' \t\r\n')
+        # strip before decoding so the trailing whitespace is never decoded
+        return bytes(self._read_bytes()).strip(b' \t\r\n').decode('utf-8')
 
     def query(self, message: str, query_delay: float = None) -> str:
         """Send the query and returns the response
@@ -137,12 +172,11 @@ class LeCroyVICP(DSOConnection):
         Returns:
             string: description
         """
-        if self.write(message, True):
+        # the response arrives after the query completes, no OPC wait needed
+        if self._send(message):
             if query_delay is not None:
                 time.sleep(query_delay)
             response = self.read(self._query_response_max_length)
-            if self._insert_wait_opc:
-                self.wait_opc()
         else:
             raise DSOIOError('Write to device failed')
 
@@ -154,9 +188,7 @@ class LeCroyVICP(DSOConnection):
         Args:
             message (string): command string
         """
-        self.write('vbs \'' + message + '\'', True)
-        if self._insert_wait_opc:
-            self.wait_opc()
+        self.write(f"vbs '{message}'", True)
 
     def query_vbs(self, message: str, query_delay: float = None) -> str:
         """formats the query as a VBS string response
@@ -167,7 +199,7 @@ class LeCroyVICP(DSOConnection):
         Returns:
             string:
         """
-        return self.query('vbs? \'Return = ' + message + '\'')
+        return self.query(f"vbs? 'Return = {message}'", query_delay)
 
     def wait_opc(self) -> bool:
         """Waits for the prior operation to complete
@@ -175,8 +207,9 @@ class LeCroyVICP(DSOConnection):
         Returns:
             bool: True on success, False on failure
         """
-        opc = self.query('*OPC?')
-        return opc == 1
+        if not self._send('*OPC?'):
+            return False
+        return self.read(self._query_response_max_length).strip() == '1'
 
     def write_raw(self, message: bytes, terminator: bool = True) -> bool:
         """write binary data to the instrument
@@ -188,7 +221,7 @@ class LeCroyVICP(DSOConnection):
         Returns:
             bool: success on success, False on failure
         """
-        return self.vicp.WriteBinary(message, len(message), terminator)
+        return self._send(message, terminator)
 
     def read_raw(self, max_bytes: int) -> memoryview:
         """reads a binary response from the instrument
@@ -199,7 +232,12 @@ class LeCroyVICP(DSOConnection):
         Returns:
             memoryview: returns the data as buffer
         """
-        return self.vicp.ReadBinary(max_bytes if max_bytes is not None else self._query_response_max_length)
+        data = memoryview(self._read_bytes())
+        if max_bytes is not None and len(data) > max_bytes:
+            # keep the rest of the response for the next read
+            self._unread = data[max_bytes:]
+            data = data[:max_bytes]
+        return data
 
     def disconnect(self):
         """Disconnects the ActiveDSO connection
@@ -208,13 +246,54 @@ class LeCroyVICP(DSOConnection):
             self.vicp.disconnect()
         self.connected = False
 
+    def _send_query(self, message: str):
+        """sends a query without the OPC wait of write, the response is read by the caller
+
+        Args:
+            message (str): query to send
+        """
+        if not self._send(message):
+            raise DSOIOError('Write to device failed')
+
+    def _read_block(self) -> memoryview:
+        """reads a definite length block response, #<k> followed by k digits and the data
+
+        Raises:
+            DSOIOError: when the response ends before the length given in the block header
+
+        Returns:
+            memoryview: data of the block, None if the response is not a block (a WARNING)
+        """
+        data = memoryview(self._read_bytes())
+        if data[:1] != b'#' or not data[1:2].tobytes().isdigit():
+            return None
+        k = int(data[1:2].tobytes())
+        end = 2 + k + int(data[2:2 + k].tobytes())
+        if len(data) < end:
+            # the block continues in the next messages
+            chunks = [data]
+            received = len(data)
+            while received < end:
+                chunk = self.vicp.receive()
+                if len(chunk) == 0:
+                    raise DSOIOError('Block response ended after {0} of {1} bytes'.format(received, end))
+                chunks.append(chunk)
+                received += len(chunk)
+            data = memoryview(b''.join(chunks))
+        return data[2 + k:end]
+
     def get_panel(self) -> str:
         """reads the instrument control state into a string
 
         Returns:
             str: panel file returned as a string, trailing terminator removed
         """
-        pass
+        self._send_query('PNSU?')
+        panel = self._read_block()
+        if panel is None:
+            return ''
+        # remove the trailing ffffffff
+        return panel[:-8].tobytes().decode('utf-8')
 
     def set_panel(self, panel: str) -> bool:
         """Set the instrument control state using a panel string, typically from the method get_panel
@@ -225,7 +304,8 @@ class LeCroyVICP(DSOConnection):
         Returns:
             bool: True on success, False on failure
         """
-        pass
+        data = (panel + 'ffffffff').encode('utf-8')
+        return self._send(b'PNSU #9%09d' % len(data) + data)
 
     def transfer_file_to_dso(self, remote_device: str, remote_filename: str, local_filename: str) -> bool:
         """Transfers a file from the PC to the remote device
@@ -238,7 +318,21 @@ class LeCroyVICP(DSOConnection):
         Returns:
             bool: True on success, False on failure
         """
-        pass
+        try:
+            # the block holds the file followed by the ffffffff trailer
+            size_of_transfer = os.path.getsize(local_filename) + 8
+            header = _trfl_header(remote_device, remote_filename) + '#9{0:09d}'.format(size_of_transfer)
+            with open(local_filename, 'rb') as fp:
+                # stream the file in blocks without EOI, the trailer ends the message
+                success = self._send(header, False)
+                chunk = fp.read(_TRANSFER_CHUNK_SIZE)
+                while success and chunk:
+                    success = self._send(chunk, False)
+                    chunk = fp.read(_TRANSFER_CHUNK_SIZE)
+        except IOError:
+            raise ParametersError('File already open or permissions error')
+
+        return success and self._send(b'ffffffff', True)
 
     def transfer_file_to_pc(self, remote_device: str, remote_filename: str, local_filename: str) -> bool:
         """Transfers a file from the remote device to the PC
@@ -251,7 +345,18 @@ class LeCroyVICP(DSOConnection):
         Returns:
             bool: True on success, False on failure
         """
-        pass
+        self._send_query(_trfl_header(remote_device, remote_filename, query=True))
+        filedata = self._read_block()
+        if filedata is None:
+            return False
+        try:
+            with open(local_filename, 'w+b') as fp:
+                # the last 8 bytes are the ffffffff trailer
+                fp.write(filedata[:-8])
+        except PermissionError:
+            return False
+
+        return True
 
     def store_hardcopy_to_file(self, format: str, aux_format: str, filename: str):
         """Transfers a hardcopy image from the isntrument and stores it on the PC
@@ -7,69 +7,107 @@
 #
 
 from pyvisa.resources.resource import Resource
-from lecroydso.errors import DSOConnectionError, ParametersError
+from lecroydso.errors import DSOConnectionError, DSOIOError, ParametersError
+import functools
+import os
 import time
 import pyvisa
 from lecroydso import DSOConnection
+from lecroydso.dsoconnection import _TRANSFER_CHUNK_SIZE, _trfl_header
+from lecroydso.lecroyvicp import LeCroyVICP
 
 maxLen = 1e6
 
 
+def _vicp_host(connection_string: str) -> str:
+    """Gets the host of a VICP::<host>[::INSTR] connection string, as LeCroyVICP expects it
+
+    Args:
+        connection_string (str): VICP connection string
+
+    Raises:
+        DSOConnectionError: on a malformed connection string
+
+    Returns:
+        str: IP address or host name
+    """
+    fields = connection_string.split('::')
+    if len(fields) == 3 and fields[2].upper() == 'INSTR':
+        fields.pop()
+    if len(fields) != 2 or not fields[1]:
+        raise DSOConnectionError('LeCroyVISA connection failed, expected VICP::<host>::INSTR, {}'.format(connection_string))
+    return fields[1]
+
+
 class LeCroyVISA(DSOConnection):
     _visa: Resource
 
     def __init__(self, connection_string: str, query_response_max_length: int = maxLen):
-        """Makes a connection to the instrument using ActiveDSO
+        """Makes a connection to the instrument using VISA, VICP::<ip>::INSTR connects with VICP directly
 
         Args:
             connection_string (str): string in a specified format
             query_response_max_length (integer, optional): description. Defaults to maxLen.
         """
-        self.connection_string = None
+        # kept even when connecting fails, reconnect() retries with it
+        self.connection_string = connection_string
         self._visa = None
+        self._vicp = None
         self.connected = False
+        self._query_response_max_length = int(query_response_max_length)
 
-        rm = pyvisa.ResourceManager()
-        resources = rm.list_resources()
-        if connection_string not in resources:
-            raise DSOConnectionError('LeCroyVISA connection failed, {}'.format(connection_string))
-            self.connected = False
-            return
-        try:
-            scope = rm.open_resource(connection_string)
+        if connection_string.upper().startswith('VICP::'):
+            # the instrument speaks VICP, talk to it directly instead of through the VISA layer
+            self._vicp = LeCroyVICP(_vicp_host(connection_string), query_response_max_length)
+            self._timeout = self._vicp.timeout
+        else:
+            rm = pyvisa.ResourceManager()
+            # open_resource fails for unknown resources, no need to scan them with list_resources
+            try:
+                scope = rm.open_resource(connection_string)
+            except (pyvisa.errors.VisaIOError, ValueError) as e:
+                raise DSOConnectionError('LeCroyVISA connection failed, {0}, {1}'.format(connection_string, e)) from e
             scope.read_termination = '\n'
             scope.write_termination = '\n'
             scope.query_delay = 0.001
+            # pyvisa reads in 20 kB pieces by default, one read request each, use the transfer block size instead
+            scope.chunk_size = _TRANSFER_CHUNK_SIZE
             scope.timeout = 10000
             if 'TCPIP' in connection_string or 'VICP' in connection_string:
                 scope.timeout = 1000
                 self._timeout = 1.0
-            idn = scope.query('*IDN?')
+            self._visa = scope
+        try:
+            # one round trip for the header setting and the identification
+            (idn, chdr) = self.query_batch(['CHDR OFF', '*IDN?', 'CHDR?'])
             if len(idn) <= 0:
                 self.connected = False
                 return
             (self._manufacturer, self._model, self._serialNumber, self._firmwareVersion) = idn.split(',')
 
-            scope.write('CHDR OFF')
-            chdr = scope.query('CHDR?')
             if 'WARNING' in chdr:
-                scope.connected = False
-                scope.close()
+                self.disconnect()
                 return
 
-            self._visa = scope
-            self.connection_string = connection_string
             self.connected = True
-            self._query_response_max_length = query_response_max_length
             self._error_string = ''
             self._error_flag = ''
             self._insert_wait_opc = False
-        except:     # noqa
-            raise DSOConnectionError("Unable to make a LeCroyVISA connection")
+        except (pyvisa.errors.VisaIOError, DSOIOError, ValueError) as e:
+            raise DSOConnectionError("Unable to make a LeCroyVISA connection") from e
 
     def __del__(self):
         self.disconnect()
 
+    @classmethod
+    def list_available(cls) -> tuple:
+        """Lists the VISA resources, this scans all the VISA interfaces and can be slow
+
+        Returns:
+            tuple: resource strings that can be used as connection_string
+        """
+        return pyvisa.ResourceManager().list_resources()
+
     @property
     def error_string(self):
         return self._error_string
@@ -80,6 +118,8 @@ class LeCroyVISA(DSOConnection):
 
     @property
     def timeout(self):
+        if self._vicp is not None:
+            return self._vicp.timeout
         return float(self._visa.timeout) / 1000.0
 
     @timeout.setter
@@ -91,7 +131,23 @@ class LeCroyVISA(DSOConnection):
 
         """
         self._timeout = timeout
-        self._visa.timeout = int(timeout * 1000)
+        if self._vicp is not None:
+            self._vicp.timeout = timeout
+        else:
+            self._visa.timeout = int(timeout * 1000)
+
+    @property
+    def query_response_max_length(self):
+        """Maximum length for a response in a query.
+        Can be set to an integer value
+        """
+        return self._query_response_max_length
+
+    @query_response_max_length.setter
+    def query_response_max_length(self, val: int):
+        self._query_response_max_length = int(val)
+        if self._vicp is not None:
+            self._vicp.query_response_max_length = val
 
     @property
     def insert_wait_opc(self):
@@ -108,13 +164,15 @@ class LeCroyVISA(DSOConnection):
             val (bool): True to insert wait_opc, False otherwise.
         """
         self._insert_wait_opc = val
+        if self._vicp is not None:
+            self._vicp.insert_wait_opc = val
 
     def reconnect(self):
         """Reconnects to the instrument with the existing credentials
         """
-        if self.connected:
-            self._visa.close()
-        self.__init__(self.connection_string)
+        connection_string = self.connection_string
+        self.disconnect()
+        self.__init__(connection_string)
 
     def write(self, message: str):
         """Sends the command
@@ -122,6 +180,10 @@ class LeCroyVISA(DSOConnection):
         Args:
             message (str): command string
         """
+        if self._vicp is not None:
+            self._error_flag = not self._vicp.write(message)
+            self._error_string = ''
+            return
         written = self._visa.write(message)
         self._error_flag = written != (len(message) + 1)
         self._error_string = ''
@@ -138,6 +200,8 @@ class LeCroyVISA(DSOConnection):
         Returns:
             string: description
         """
+        if self._vicp is not None:
+            return self._vicp.query(message, query_delay)
         if self._visa.write(message) == (len(message) + 1):
             if query_delay is not None:
                 time.sleep(query_delay)
@@ -153,15 +217,35 @@ class LeCroyVISA(DSOConnection):
         self._error_string = ''
         return response
 
+    def query_batch(self, cmds: list) -> list:
+        """Sends the commands as a single compound command and returns the responses of the queries
+
+        Args:
+            cmds (list): commands to send, queries have a header ending with '?'
+
+        Returns:
+            list: responses of the queries in the order sent, the responses must not contain ';'
+        """
+        num_queries = sum(1 for cmd in cmds if cmd.strip().split(' ', 1)[0].endswith('?'))
+        if self._vicp is not None:
+            self._vicp._send_query(';'.join(cmds))
+            read = functools.partial(self._vicp.read, self._query_response_max_length)
+        else:
+            self._visa.write(';'.join(cmds))
+            read = self._visa.read
+        # the instrument returns the responses separated by ';', usually in a single line
+        responses = []
+        while len(responses) < num_queries:
+            responses.extend(read().split(';'))
+        return responses
+
     def write_vbs(self, message: str):
         """Sends the command as a vbs formatted comamnd
 
         Args:
             message (str): command string
         """
-        self.write('vbs \'' + message + '\'')
-        if self._insert_wait_opc:
-            self.wait_opc()
+        self.write(f"vbs '{message}'")
 
     def query_vbs(self, message: str, query_delay: float = None) -> str:
         """Formats the query as a VBS string response
@@ -172,7 +256,7 @@ class LeCroyVISA(DSOConnection):
         Returns:
             string: returns the reponse as a string
         """
-        response = self.query('vbs? \'Return = ' + message + '\'', query_delay)
+        response = self.query(f"vbs? 'Return = {message}'", query_delay)
         return response
 
     def wait_opc(self) -> bool:
@@ -181,13 +265,18 @@ class LeCroyVISA(DSOConnection):
         Returns:
             boolean: True on success, False on failure
         """
-        return self._visa.query('*OPC?')
+        if self._vicp is not None:
+            return self._vicp.wait_opc()
+        return self._visa.query('*OPC?').strip() == '1'
 
     def disconnect(self):
         """Disconnects the connection
         """
+        if self._vicp is not None:
+            self._vicp.disconnect()
         if self._visa is not None:
             self._visa.close()
+            self._visa = None
         self.connected = False
 
     def write_raw(self, message: bytes, terminator: bool = True) -> bool:
@@ -200,9 +289,18 @@ class LeCroyVISA(DSOConnection):
         Returns:
             bool: success on success, False on failure
         """
-        self._visa.write_raw(message)
+        if self._vicp is not None:
+            return self._vicp.write_raw(message, terminator)
         if terminator:
-            self._visa.write_termination()
+            message = bytes(message) + self._visa.write_termination.encode('utf-8')
+        # END is only asserted after the terminated write, so a message can be sent in several writes
+        send_end = self._visa.send_end
+        self._visa.send_end = terminator
+        try:
+            written = self._visa.write_raw(message)
+        finally:
+            self._visa.send_end = send_end
+        return written == len(message)
 
     def read_raw(self, max_bytes: int) -> memoryview:
         """Reads a binary response from the instrument
@@ -213,25 +311,36 @@ class LeCroyVISA(DSOConnection):
         Returns:
             memoryview: returns the data as memoryview
         """
+        if self._vicp is not None:
+            return self._vicp.read_raw(max_bytes)
         return memoryview(self._visa.read_bytes(max_bytes, break_on_termchar=True))
 
+    def _read_block_length(self) -> int:
+        """Reads the header of a definite length block, #<k> followed by k digits
+
+        Returns:
+            int: number of bytes in the block, -1 if the response is not a block (a WARNING)
+        """
+        header = self._visa.read_bytes(2)
+        if header[:1] != b'#' or not header[1:2].isdigit():
+            return -1
+        return int(self._visa.read_bytes(int(header[1:2])))
+
     def get_panel(self) -> str:
         """Reads the instrument control state into a string
 
         Returns:
             str: panel file returned as a string, trailing terminator removed
         """
+        if self._vicp is not None:
+            return self._vicp.get_panel()
         self._visa.write('PNSU?')
-        time.sleep(0.1)
 
-        # read the first 11 bytes, this gives us the length of the transfer
-        header = self._visa.read_bytes(11)
-        if 'WARNING' in str(header):
+        # the block header gives us the length of the transfer
+        bytes = self._read_block_length()
+        if bytes < 0:
             return ''
 
-        # get number of bytes in the response
-        bytes = int(header.decode('utf-8').replace('#9', ''))
-
         # read the amount of data
         panel = self._visa.read_bytes(bytes)
         # convert from a bytes array to a string and remove the trailing ffffffff
@@ -246,6 +355,8 @@ class LeCroyVISA(DSOConnection):
         Returns:
             bool: True on success, False on failure
         """
+        if self._vicp is not None:
+            return self._vicp.set_panel(panel)
         written = self._visa.write_binary_values('PNSU ', (panel + 'ffffffff').encode('utf-8'), datatype='b')
         return written >= len(panel)
 
@@ -260,19 +371,23 @@ class LeCroyVISA(DSOConnection):
         Returns:
             bool: True on success, False on failure
         """
-        size_of_transfer = 0
+        if self._vicp is not None:
+            return self._vicp.transfer_file_to_dso(remote_device, remote_filename, local_filename)
         try:
+            # the block holds the file followed by the ffffffff trailer
+            size_of_transfer = os.path.getsize(local_filename) + 8
+            header = _trfl_header(remote_device, remote_filename).encode('utf-8') + b'#9%09d' % size_of_transfer
             with open(local_filename, 'rb') as fp:
-                fp.seek(0)
-                filearray = fp.read()
-                filearray += 'ffffffff'.encode('utf-8')
-                size_of_transfer = len(filearray)
-                header = 'TRFL DISK,{0},FILE,"{1}",'.format(remote_device, remote_filename)
-                written = self._visa.write_binary_values(header, filearray, datatype='B')
+                # stream the file instead of reading it into memory
+                success = self.write_raw(header, False)
+                chunk = fp.read(_TRANSFER_CHUNK_SIZE)
+                while success and chunk:
+                    success = self.write_raw(chunk, False)
+                    chunk = fp.read(_TRANSFER_CHUNK_SIZE)
         except IOError:
             raise ParametersError('File already open or permissions error')
 
-        return written >= size_of_transfer
+        return success and self.write_raw(b'ffffffff', True)
 
     def transfer_file_to_pc(self, remote_device: str, remote_filename: str, local_filename: str) -> bool:
         """Transfers a file from the remote device to the PC
@@ -285,28 +400,39 @@ class LeCroyVISA(DSOConnection):
         Returns:
             bool: True on success, False on failure
         """
-        header = 'TRFL? DISK,{0},FILE,"{1}",'.format(remote_device, remote_filename)
-        self._visa.write(header)
-        time.sleep(0.1)
-
-        # read the first 11 bytes, this gives us the length of the transfer
-        header = self._visa.read_bytes(11)
-        if 'WARNING' in str(header):
-            return ''
-
-        # get number of bytes in the response
-        bytes = int(header.decode('utf-8').replace('#9', ''))
-
-        # read the amount of data
-        filedata = self._visa.read_bytes(bytes)
-        # convert from a bytes array to a string and remove the trailing ffffffff
+        if self._vicp is not None:
+            return self._vicp.transfer_file_to_pc(remote_device, remote_filename, local_filename)
+        # open the file before asking for the data, a failure here must not leave the file on the bus
         try:
-            with open(local_filename, 'w+b') as fp:
-                fp.write(filedata.strip(b'ffffffff'))
-        except PermissionError:
+            fp = open(local_filename, 'w+b')
+        except OSError:
             return False
 
-        return True
+        with fp:
+            self._visa.write(_trfl_header(remote_device, remote_filename, query=True))
+
+            # the block header gives us the length of the transfer, the last 8 bytes are the ffffffff trailer
+            bytes = self._read_block_length()
+            if bytes < 0:
+                return False
+
+            # write the data to the file as it is read
+            remaining = bytes - 8
+            success = True
+            while remaining > 0:
+                chunk = self._visa.read_bytes(min(remaining, _TRANSFER_CHUNK_SIZE))
+                if not chunk:
+                    return False
+                remaining -= len(chunk)
+                if success:
+                    try:
+                        fp.write(chunk)
+                    except OSError:
+                        # keep reading the block, it would answer the next query otherwise
+                        success = False
+        self._visa.read_bytes(8)
+
+        return success
 
     def store_hardcopy_to_file(self, format: str, aux_format: str, filename: str):
         """Transfers a hardcopy image from the isntrument and stores it on the PC
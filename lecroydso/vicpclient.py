@@ -1,12 +1,24 @@
+import errno
 import logging
+import os
 import socket
 import select
-from struct import pack, unpack_from
-
-import time
+import struct
 
 logger = logging.getLogger(__name__)
 
+# default socket buffer sizes, large enough to keep multi-MB waveform transfers streaming
+_SOCKET_BUFFER_SIZE = 4 << 20
+
+# buffers passed to a single sendmsg call, well below the usual IOV_MAX of 1024
+_MAX_SEND_BUFFERS = 512
+
+# connect_ex results of a non-blocking connect that is still in progress (or already done)
+_CONNECT_PENDING = frozenset({0, errno.EINPROGRESS, errno.EWOULDBLOCK, getattr(errno, 'WSAEWOULDBLOCK', errno.EWOULDBLOCK)})
+
+# header layout: operation, version, sequence number, unused, block size
+_HDR = struct.Struct('>4Bi')
+
 # VICP Headers:
 #
 #       Byte    Description
@@ -33,6 +45,12 @@ logger = logging.getLogger(__name__)
 #       D1      Reserved    Reserved for future expansion
 #       D0      EOI         Block terminated in EOI
 
+_OPERATION_BITS = ((1 << 7, 'DATA'), (1 << 6, 'REMOTE'), (1 << 5, 'LOCKOUT'), (1 << 4, 'CLEAR'),
+                   (1 << 3, 'SRQ'), (1 << 2, 'SERIALPOLL'), (1 << 1, 'Reserved'), (1 << 0, 'EOI'))
+
+# string for every operation byte, used by what_operation
+_OPERATION_NAMES = tuple(''.join('|' + name for (bit, name) in _OPERATION_BITS if op & bit) for op in range(256))
+
 
 class VICPClient():
     DATA = 1 << 7
@@ -44,23 +62,30 @@ class VICPClient():
     Reserved = 1 << 1
     EOI = 1 << 0
 
-    def __init__(self, ip: str, port: int):
+    def __init__(self, ip: str, port: int, receive_buffer_size: int = _SOCKET_BUFFER_SIZE,
+                 send_buffer_size: int = _SOCKET_BUFFER_SIZE):
         """VICP Client Class initialized with IP address and port
 
         Args:
             ip (str): IP Address to connect
             port (int): Port Index
+            receive_buffer_size (int, optional): socket receive buffer size in bytes, None keeps the system default.
+                Defaults to 4 MiB.
+            send_buffer_size (int, optional): socket send buffer size in bytes, None keeps the system default.
+                Defaults to 4 MiB.
         """
         self.ip = ip
         self.port = port
+        self.receive_buffer_size = receive_buffer_size
+        self.send_buffer_size = send_buffer_size
         self._timeout = 1.0
         self.sock = None
         self.seq_num = 1
+        self._hdr_buf = bytearray(_HDR.size)
         self.__connected = False
 
     def __del__(self):
         self.disconnect()
-        self.__connected = False
 
     @property
     def timeout(self):
@@ -75,6 +100,8 @@ class VICPClient():
 
         """
         self._timeout = timeout
+        if self.sock is not None:
+            self.sock.settimeout(timeout)
 
     def connect(self, timeout: float = 1.0) -> bool:
         """Connect to IP address and Port
@@ -85,66 +112,132 @@ class VICPClient():
         Returns:
             [bool]: True on success, if not False
         """
-        logger.debug("vicpclient.connect(timeout={0})".format(timeout))
+        logger.debug("vicpclient.connect(timeout=%s)", timeout)
         # command sending socket
 
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.sock.setblocking(0)
-
-        starttime = time.process_time()
-        while True:
-            try:
-                connect_result = self.sock.connect_ex((self.ip, self.port))    # noqa
-
-                (rlist, wlist, elist) = select.select([], [self.sock], [], 0.2)
-
-                if self.sock in wlist:
-                    logger.debug("vicpclient.connect() connected")
-                    self.__connected = True
-                    return True
-                elif time.process_time() - starttime > timeout:
+        # commands are small request/response messages, send them without waiting on Nagle's algorithm
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # detect a dead instrument on idle connections
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        # the buffer sizes must be set before connecting for the TCP window to use them
+        if self.receive_buffer_size is not None:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer_size)
+        if self.send_buffer_size is not None:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer_size)
+        self.sock.setblocking(False)
+
+        try:
+            # start the connection and wait once for it to complete
+            err = self.sock.connect_ex((self.ip, self.port))
+            if err in _CONNECT_PENDING:
+                (rlist, wlist, xlist) = select.select([], [self.sock], [], timeout)
+                if len(wlist) == 0:
                     logger.error("vicpclient.connect() timed out")
+                    self._close_socket()
                     return False
-            except OSError:
-                self.sock = None
-                return False
+                err = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        except OSError as e:
+            err = e.errno
+        if err != 0:
+            logger.error("vicpclient.connect() failed: %s", os.strerror(err) if err else 'unknown error')
+            self._close_socket()
+            return False
 
-    def disconnect(self):
-        """Disconnect the VICP connection
+        logger.debug("vicpclient.connect() connected")
+        # blocking with a timeout from here on, so sendall/recv wait for the socket themselves
+        self.sock.settimeout(self._timeout)
+        self.__connected = True
+        return True
+
+    def _close_socket(self):
+        """Closes the socket of a failed connection attempt
         """
         if self.sock is not None:
             self.sock.close()
-            self.sock.shutdown(socket.SHUT_RDWR)
             self.sock = None
 
-    def send_small_data_and_header(self, data: bytes) -> bool:
+    def disconnect(self):
+        """Disconnect the VICP connection
+        """
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                # not connected or already reset by the instrument
+                pass
+            finally:
+                self.sock.close()
+                self.sock = None
+                self.__connected = False
+
+    def send_small_data_and_header(self, data, eoi: bool = True) -> bool:
         """Send data and header
 
         Args:
-            data (bytes): data as bytes
+            data (str or bytes): data to send, str is encoded as utf-8
+            eoi (bool, optional): True to terminate the message with EOI. Defaults to True.
+
+        Returns:
+            bool: True on success, if not False
+        """
+        return self.send_many([data], eoi)
+
+    def send_many(self, datas: list, eoi: bool = True) -> bool:
+        """Send several messages, each with its own header, in a single write
+
+        Args:
+            datas (list): messages as str or bytes, str is encoded as utf-8
+            eoi (bool, optional): True to terminate each message with EOI. Defaults to True.
 
         Returns:
             bool: True on success, if not False
         """
         self.flush()
-        d = data.encode()
-        block_size = len(d)
-        head = self.make_header(self.DATA | self.EOI, 1, block_size)
-        logger.debug("sending data: {0}".format(data))
-        (rlist, wlist, xlist) = select.select([], [self.sock], [], self._timeout)
-        if len(wlist) == 0:
-            logger.error("socket not ready, data not sent")
+        operation = self.DATA | self.EOI if eoi else self.DATA
+        buffers = []
+        for data in datas:
+            # commands may hold non-ascii text (file names, units), so str is encoded as utf-8
+            d = memoryview(data.encode('utf-8') if isinstance(data, str) else data).cast('B')
+            buffers.append(self.make_header(operation, 1, d.nbytes))
+            buffers.append(d)
+        logger.debug("sending data: %s", datas)
+        try:
+            sent = self._send_buffers(buffers)
+        except OSError as e:
+            logger.error("error sending data: %s", e)
             return False
-        else:
-            sent = self.sock.send(head + d)
-            if sent > 0:
-                logger.debug("sent {0} bits of data: {1} done".format(sent, data[0:sent]))
-            else:
-                logger.error("error sending data")
-                return False
-
+        logger.debug("sent %d bytes of data done", sent)
         return True
 
+    def _send_buffers(self, buffers: list) -> int:
+        """Sends all the buffers in order without joining them into one copy
+
+        Args:
+            buffers (list): byte buffers to send
+
+        Returns:
+            int: number of bytes sent
+        """
+        if not hasattr(self.sock, 'sendmsg'):
+            # no gather send on this platform (Windows)
+            data = b''.join(buffers)
+            self.sock.sendall(data)
+            return len(data)
+        views = [memoryview(buf) for buf in buffers if len(buf) > 0]
+        total = 0
+        first = 0
+        while first < len(views):
+            sent = self.sock.sendmsg(views[first:first + _MAX_SEND_BUFFERS])
+            total += sent
+            # the kernel may take part of the data, skip what was sent and retry with the rest
+            while first < len(views) and sent >= len(views[first]):
+                sent -= len(views[first])
+                first += 1
+            if sent > 0:
+                views[first] = views[first][sent:]
+        return total
+
     def make_header(self, operation: int, sequence_number: int, block_size: int) -> bytes:
         """Creates a series of bytes for the header for transfer
 
@@ -158,7 +251,7 @@ class VICPClient():
         """
         version = 1
         dummy = 0
-        return pack('>4Bi', operation, version, sequence_number, dummy, block_size)
+        return _HDR.pack(operation, version, sequence_number, dummy, block_size)
 
     def receive(self) -> bytes:
         """Reads data from the VICP port
@@ -167,20 +260,22 @@ class VICPClient():
             bytes: return the data as bytes
         """
         number = 0
-        data = b''
+        # collect the blocks and join them once, appending to bytes copies everything received so far
+        chunks = []
         logger.debug("receiving")
         while True:
             (operation, sequence_number, block_size) = self.receive_header()
             if sequence_number == -1:
                 break
-            logger.debug("operation: {0}".format(self.what_operation(operation)))
-            logger.debug("sequence_number: {0}".format(sequence_number))
-            logger.debug("block_size: {0}".format(block_size))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("operation: %s", self.what_operation(operation))
+            logger.debug("sequence_number: %d", sequence_number)
+            logger.debug("block_size: %d", block_size)
             current_data = 0
             if block_size > 0:
                 current_data = self.receive_data(block_size)
-                data += current_data
-                logger.debug("data: {0}".format(current_data))
+                chunks.append(current_data)
+                logger.debug("data: %s", current_data)
 
                 if sequence_number == number + 1:
                     number = sequence_number
@@ -188,6 +283,7 @@ class VICPClient():
                 logger.debug("got EOI")
                 break
 
+        data = b''.join(chunks)
         logger.debug("receiving done")
         logger.debug("data received")
         logger.debug(data)
@@ -200,14 +296,14 @@ class VICPClient():
         Returns:
             tuple: returns (operation, sequence_numberm block_size)
         """
-        # read the header
-        (rlist, wlist, xlist) = select.select([self.sock], [], [], self._timeout)
-        if len(rlist) == 0:
+        # read the header, recv may return it in pieces
+        d = self._hdr_buf
+        if self._recv_into(memoryview(d)) < _HDR.size:
             logger.error("socket not ready to receive header")
             return (self.EOI, -1, 0)
-        d = self.sock.recv(8)
-        (operation, version, sequence_number, dummy, block_size) = unpack_from('>4Bi', d)
-        logger.debug("header: {0:#08b} {1} {2} {3} {4}".format(operation, version, sequence_number, dummy, block_size))
+        (operation, version, sequence_number, dummy, block_size) = _HDR.unpack_from(d)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("header: {0:#08b} {1} {2} {3} {4}".format(operation, version, sequence_number, dummy, block_size))
         return (operation, sequence_number, block_size)
 
     def receive_data(self, block_size: int) -> bytes:
@@ -219,22 +315,40 @@ class VICPClient():
         Returns:
             bytes: data as a byte array
         """
-        logger.debug("receiving data, blocksize {0}".format(block_size))
-        (rlist, wlist, xlist) = select.select([self.sock], [], [], self._timeout)
-        if len(rlist) == 0:
-            logger.error("socket not ready to receive data")
-            return (self.EOI, -1, 0)
-        # read the data
-        d = self.sock.recv(block_size)
-#       data = unpack_from(str(block_size)+"b", d )
-#       print("data", data)
-        return d
+        logger.debug("receiving data, blocksize %d", block_size)
+        # read the data, a block usually arrives in several TCP segments
+        d = bytearray(block_size)
+        received = self._recv_into(memoryview(d))
+        if received < block_size:
+            logger.error("received %d of %d bytes", received, block_size)
+            del d[received:]
+        return bytes(d)
+
+    def _recv_into(self, buf: memoryview) -> int:
+        """Receives until buf is full, the connection closes or the timeout expires
+
+        Args:
+            buf (memoryview): buffer to fill
+
+        Returns:
+            int: number of bytes received
+        """
+        received = 0
+        try:
+            while received < len(buf):
+                n = self.sock.recv_into(buf[received:])
+                if n == 0:
+                    break
+                received += n
+        except OSError as e:
+            logger.error("error receiving data: %s", e)
+        return received
 
     def device_clear(self):
         """Clears the Device buffers
         """
         head = self.make_header(self.CLEAR | self.EOI, 1, 1)
-        self.sock.send(head + b'')
+        self.sock.sendall(head)
         self.receive()
 
     def flush(self):
@@ -263,21 +377,4 @@ class VICPClient():
         Returns:
             str: string equivalent of the operation
         """
-        out = ""
-        if (op & self.DATA):
-            out += "|DATA"
-        if (op & self.REMOTE):
-            out += "|REMOTE"
-        if (op & self.LOCKOUT):
-            out += "|LOCKOUT"
-        if (op & self.CLEAR):
-            out += "|CLEAR"
-        if (op & self.SRQ):
-            out += "|SRQ"
-        if (op & self.SERIALPOLL):
-            out += "|Reserved"
-        if (op & self.Reserved):
-            out += "|Reserved"
-        if (op & self.EOI):
-            out += "|EOI"
-        return out
+        return _OPERATION_NAMES[op & 0xFF]
@@ -1,9 +1,28 @@
+import asyncio
+import contextlib
+import logging
+import mmap
 import pytest
 import os
 import tempfile
 from lecroydso import ActiveDSO, LeCroyVISA, LeCroyVICP, DSOConnection
 from lecroydso.errors import DSOConnectionError
 
+logger = logging.getLogger(__name__)
+
+
+def connect_vicp(ip: str) -> LeCroyVICP:
+    # the instrument may still be on the TCPIP (VICP) interface, e.g. after an interrupted run, try it first
+    try:
+        return LeCroyVICP(ip)
+    except DSOConnectionError:
+        pass
+    # switch the remote interface over a VXI-11 link
+    conn = LeCroyVISA('TCPIP0::{}::inst0::INSTR'.format(ip))
+    conn.write_vbs('app.Utility.Remote.Interface="TCPIP"')
+    conn.disconnect()
+    return LeCroyVICP(ip)
+
 
 @pytest.fixture(scope='module', params=['ActiveDSO', 'LeCroyVISA', 'LeCroyVICP'])
 def conn(request) -> DSOConnection:
@@ -17,12 +36,7 @@ def conn(request) -> DSOConnection:
             connection_string = 'TCPIP0::127.0.0.1::inst0::INSTR'
             conn = LeCroyVISA(connection_string)
         if request.param == 'LeCroyVICP':
-            connection_string = 'TCPIP0::127.0.0.1::inst0::INSTR'
-            conn = LeCroyVISA(connection_string)
-            conn.write_vbs('app.Utility.Remote.Interface="TCPIP"')
-            conn.disconnect()
-            connection_string = '127.0.0.1'
-            conn = LeCroyVICP(connection_string)
+            conn = connect_vicp('127.0.0.1')
         conn.write('CHDR OFF')
         chdr = conn.query('CHDR?')
         assert 'WARNING' not in chdr, 'Connection on the instrument set to TCPIP, please set to LXI'
@@ -36,7 +50,29 @@ def conn(request) -> DSOConnection:
 
 def test_connection(conn: DSOConnection):
     ver = conn.query('*idn?')
-    print(ver)
+    logger.debug('*IDN? response: %s', ver)
+
+
+def test_concurrent_connections():
+    # open two VXI-11 links and query both concurrently, the round trips overlap instead of adding up
+    connection_string = 'TCPIP0::127.0.0.1::inst0::INSTR'
+
+    async def open_and_query():
+        loop = asyncio.get_event_loop()
+        conns = await asyncio.gather(*[loop.run_in_executor(None, LeCroyVISA, connection_string) for i in range(2)])
+        try:
+            return await asyncio.gather(*[conn.query_async('*IDN?') for conn in conns])
+        finally:
+            for conn in conns:
+                conn.disconnect()
+
+    loop = asyncio.new_event_loop()
+    try:
+        idns = loop.run_until_complete(open_and_query())
+    finally:
+        loop.close()
+    assert len(idns[0]) > 0
+    assert idns[0] == idns[1]
 
 
 @pytest.mark.parametrize('conn_type', [ActiveDSO, LeCroyVISA, LeCroyVICP])
@@ -50,17 +86,21 @@ def test_bad_connection(conn_type):
         assert 'connection failed' in err.message
 
 
+def multiquery(conn: DSOConnection, *queries) -> list:
+    # send the queries as one compound command, one round trip instead of one per query
+    return conn.query(';'.join(queries)).split(';')
+
+
 def test_basic_commands(conn: DSOConnection):
     conn.write('CHDR OFF')
-    print(conn.error_string)
+    logger.debug('error string: %s', conn.error_string)
     assert conn.error_flag is False
 
-    idn = conn.query('*IDN?')
+    conn.write_vbs('app.Acquisition.C1.VerScale=0.01')
+    (idn, chdr, response) = multiquery(conn, '*IDN?', 'CHDR?', 'C1:VDIV?')
     assert conn.error_flag is False
     assert len(idn) > 0
-
-    conn.write_vbs('app.Acquisition.C1.VerScale=0.01')
-    response = conn.query('C1:VDIV?')
+    assert chdr == 'OFF'
     assert '10E-3' in response
 
     id = conn.query_vbs('app.InstrumentID')
@@ -82,8 +122,16 @@ def panel_functions(conn: DSOConnection):
     assert conn.set_panel(setup)
 
 
-def file_transfer(conn: DSOConnection):
-    random_bytes = os.urandom(100000)
+def file_contents_equal(filename: str, data: bytes) -> bool:
+    # map the file instead of reading it, the comparison runs on the page cache without a copy
+    with open(filename, 'rb') as fp:
+        if os.fstat(fp.fileno()).st_size != len(data):
+            return False
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            return view == data
+
+
+def file_transfer(conn: DSOConnection, random_bytes: bytes):
     source_file = os.path.join(tempfile.gettempdir(), 'conn_test.bin')
     dest_file = r'C:\Temp\conn_test.bin'
     with open(source_file, 'wb+') as fp:
@@ -91,23 +139,17 @@ def file_transfer(conn: DSOConnection):
     success = conn.transfer_file_to_dso('HDD', dest_file, source_file)
     assert success
     # check if the file exists, since we are executing on the same machine(localhost)
-    # we can confirm that the file exists and check contents
-    assert os.path.isfile(dest_file)
-    with open(dest_file, 'rb') as fp:
-        transferred_bytes = fp.read()
-        assert random_bytes == transferred_bytes   # check if the source and destination bytes are the same
+    # we can confirm that the file exists and check contents, opening a missing file fails the test
+    assert file_contents_equal(dest_file, random_bytes)    # check if the source and destination bytes are the same
 
     remote_file = dest_file
     dest_file = source_file
-    if os.path.isfile(dest_file):
+    with contextlib.suppress(FileNotFoundError):
         os.remove(dest_file)
     success = conn.transfer_file_to_pc('HDD', remote_file, dest_file)
-    assert os.path.isfile(dest_file)
-    with open(dest_file, 'rb') as fp:
-        transferred_bytes = fp.read()
-        assert random_bytes == transferred_bytes   # check if the source and destination bytes are the same
+    assert file_contents_equal(dest_file, random_bytes)    # check if the source and destination bytes are the same
 
 
-def test_utilities(conn: DSOConnection):
-    file_transfer(conn)
+def test_utilities(conn: DSOConnection, random_payload: bytes):
+    file_transfer(conn, random_payload)
     panel_functions(conn)
@@ -4,7 +4,11 @@ from lecroydso import ActiveDSO
 from lecroydso import LeCroyVISA
 from lecroydso import DSOConnectionError, DSOIOError, ParametersError   # noqa
 
+import logging
 import os
+
+logger = logging.getLogger(__name__)
+
 use_activedso = True
 
 if os.name != 'nt':
@@ -48,6 +52,11 @@ def test_properties(dso: LeCroyDSO):
     assert 50e-9 == dso.hor_scale
     dso.hor_offset = 100e-9
     assert dso.hor_offset == 100e-9
+    (hor_scale, num_points, sample_rate, time_per_point) = dso.get_horizontal_state()
+    assert hor_scale == dso.get_hor_scale()
+    assert num_points == dso.get_num_points()
+    assert sample_rate == dso.get_sample_rate()
+    assert time_per_point == dso.get_time_per_point()
 
 
 def test_acquisition(dso: LeCroyDSO):
@@ -71,8 +80,8 @@ def test_get_waveform(dso: LeCroyDSO):
 def test_dialog_functions(dso: LeCroyDSO):
     pages = dso.get_docked_dialog_page_names()
     sel_page = dso.get_docked_dialog_selected_page()
-    print(sel_page)
-    print(pages)
+    logger.debug('docked dialog pages: %s, selected page: %s', pages, sel_page)
+    assert dso.get_docked_dialog_state() == (pages, sel_page)
 
 
 def test_invalid_parameters(dso: LeCroyDSO):
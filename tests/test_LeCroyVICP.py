@@ -0,0 +1,150 @@
+import socket
+import struct
+import threading
+import os
+import pytest
+import lecroydso.lecroyvicp
+from lecroydso import LeCroyDSO, LeCroyVISA, DSOIOError
+from lecroydso.vicpclient import VICPClient
+
+# waveform returned by the fake instrument, a block of 10 bytes after the 15 byte header
+WAVEFORM = b'0123456789'
+
+RESPONSES = {
+    b'CHDR OFF;*IDN?;CHDR?': b'LECROY,WAVERUNNER,LCRY0001,9.0;OFF',
+    b'*IDN?': b'LECROY,WAVERUNNER,LCRY0001,9.0',
+    b'C1:WF?': b'ALL,#9' + b'%09d' % len(WAVEFORM) + WAVEFORM,
+}
+
+
+def block(data: bytes) -> bytes:
+    return b'#9' + b'%09d' % len(data) + data
+
+
+def answer(message: bytes, storage: dict) -> bytes:
+    # response of the fake instrument to a message, None if it isn't a query
+    if message in RESPONSES:
+        return RESPONSES[message]
+    if message.startswith(b'vbs? '):
+        return b'C1,C2,C3,C4;1000' if b'ExecsNameAll' in message else b'0'
+    if message.startswith(b'PNSU #9'):
+        storage['panel'] = message[len(b'PNSU #9') + 9:]
+    elif message == b'PNSU?':
+        return block(storage['panel'])
+    elif message.startswith(b'TRFL DISK,'):
+        (command, sep, data) = message.partition(b'#9')
+        storage[command.split(b'FILE,')[1]] = data[9:]
+    elif message.startswith(b'TRFL? DISK,'):
+        data = storage.get(message.split(b'FILE,')[1])
+        # an unknown file answers a block shorter than its header says
+        return block(data) if data is not None else b'#9000001000' + b'0' * 10
+    return None
+
+
+def serve_vicp(server: socket.socket, received: list):
+    # answers the queries of a single connection, keeps panels and files sent to it, all messages go to received
+    conn, addr = server.accept()
+    storage = {}
+    message = b''
+    with conn:
+        while True:
+            header = conn.recv(8, socket.MSG_WAITALL)
+            if len(header) < 8:
+                break
+            (operation, version, sequence_number, unused, block_size) = struct.unpack('>4Bi', header)
+            if operation & VICPClient.CLEAR:
+                # device_clear sends the header alone
+                conn.sendall(struct.pack('>4Bi', VICPClient.DATA | VICPClient.EOI, 1, 1, 0, 0))
+                continue
+            message += conn.recv(block_size, socket.MSG_WAITALL) if block_size > 0 else b''
+            if not operation & VICPClient.EOI:
+                # the message continues in the next block
+                continue
+            received.append(message)
+            response = answer(message, storage)
+            message = b''
+            if response is not None:
+                conn.sendall(struct.pack('>4Bi', VICPClient.DATA | VICPClient.EOI, 1, 1, 0, len(response) + 1) + response + b'\n')
+
+
+@pytest.fixture
+def received() -> list:
+    return []
+
+
+@pytest.fixture
+def transport(monkeypatch, received: list) -> LeCroyVISA:
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+    port = server.getsockname()[1]
+    threading.Thread(target=serve_vicp, args=(server, received), daemon=True).start()
+    # connect to the fake instrument instead of the VICP port
+    monkeypatch.setattr(lecroydso.lecroyvicp, 'VICPClient', lambda ip, vicp_port: VICPClient(ip, port))
+    transport = LeCroyVISA('VICP::127.0.0.1::INSTR')
+    assert transport.connected, 'Unable to make connection'
+    yield transport
+    transport.disconnect()
+    server.close()
+
+
+@pytest.fixture
+def dso(transport: LeCroyVISA) -> LeCroyDSO:
+    return LeCroyDSO(transport)
+
+
+def test_get_waveform(dso: LeCroyDSO):
+    wf = dso.get_waveform('C1')
+    assert bytes(wf) == WAVEFORM
+    # the rest of the waveform response must not answer the next query
+    assert dso.query('*IDN?') == 'LECROY,WAVERUNNER,LCRY0001,9.0'
+
+
+def test_pipeline(dso: LeCroyDSO, received: list):
+    received.clear()
+    with dso.pipeline():
+        dso.write_vbs('app.Acquisition.C1.VerScale = 0.1')
+        dso.write_vbs('app.Acquisition.C1.VerOffset = 0')
+        # a single-line If ends the batch, nothing may be joined after it
+        dso.write_vbs('if app.Acquisition.C2.View then app.Acquisition.C2.VerOffset = 0')
+        dso.write_vbs('app.Acquisition.C3.View = 0')
+    # the query is answered after the server got the commands before it
+    dso.query('*IDN?')
+    assert received == [b"vbs 'app.Acquisition.C1.VerScale = 0.1:app.Acquisition.C1.VerOffset = 0:"
+                        b"if app.Acquisition.C2.View then app.Acquisition.C2.VerOffset = 0'",
+                        b"vbs 'app.Acquisition.C3.View = 0'",
+                        b'*IDN?']
+
+
+def test_pipeline_error(dso: LeCroyDSO, received: list):
+    received.clear()
+    with pytest.raises(ValueError):
+        with dso.pipeline():
+            dso.write_vbs('app.Acquisition.C1.VerScale = 0.1')
+            raise ValueError('half built batch')
+    dso.query('*IDN?')
+    assert received == [b'*IDN?']
+
+
+def test_panel(transport: LeCroyVISA):
+    panel = "' XStreamDSO ConfigurationVBScript ...\r\nSet XStreamDSO = CreateObject(\"LeCroy.XStreamDSO\")\r\n"
+    assert transport.set_panel(panel)
+    assert transport.get_panel() == panel
+
+
+def test_file_transfer(transport: LeCroyVISA, tmp_path):
+    # larger than a transfer chunk, so the upload is sent in several blocks
+    data = os.urandom((1 << 20) + 1000)
+    source_file = tmp_path / 'source.bin'
+    source_file.write_bytes(data)
+    assert transport.transfer_file_to_dso('HDD', r'D:\test.bin', str(source_file))
+    dest_file = tmp_path / 'dest.bin'
+    assert transport.transfer_file_to_pc('HDD', r'D:\test.bin', str(dest_file))
+    assert dest_file.read_bytes() == data
+
+
+def test_short_block(transport: LeCroyVISA, tmp_path):
+    # the block header of the response announces more data than arrives
+    transport.timeout = 0.2
+    with pytest.raises(DSOIOError):
+        transport.transfer_file_to_pc('HDD', r'D:\missing.bin', str(tmp_path / 'missing.bin'))